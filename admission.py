@@ -0,0 +1,155 @@
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+
+# gate = concurrent operations : queued waiters. "endpoint.platform" gates are
+# taken before the endpoint's own, so a slow platform waits in its own queue
+# without holding endpoint slots the other platform could use
+DEFAULT_ADMISSION_LIMITS = (
+    "video_info=16:32,"
+    "video_info.facebook=4:8,"
+    "download=8:16,"
+    "download.facebook=3:6,"
+    # Held for a whole archive; items inside take video_info slots as well
+    "bundle=4:4"
+)
+# Longest a request waits for a slot before it is shed
+MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", "2"))
+MAX_RETRY_AFTER = 30
+
+
+class Overloaded(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_admission_limits(value):
+    limits = {}
+    for item in value.split(","):
+        name, _, spec = item.strip().partition("=")
+        concurrency, _, queued = spec.partition(":")
+        try:
+            limits[name.lower()] = (int(concurrency), int(queued or 0))
+        except ValueError:
+            continue
+    return limits
+
+
+class Gate:
+    """Concurrency limit with a short, bounded queue in front of it.
+
+    A request that finds every slot busy waits behind at most queue_size
+    others; beyond that, or once it has waited max_wait, it is shed with a
+    Retry-After estimated from how long slots have recently been held.
+    """
+
+    def __init__(self, name, limit, queue_size):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self.cond = threading.Condition()
+        # Smoothed time a slot is held, for Retry-After
+        self.hold_seconds = 1.0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.peak_active = 0
+        self.peak_waiting = 0
+
+    def retry_after(self):
+        backlog = (self.waiting + 1) / max(1, self.limit)
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(self.hold_seconds * backlog)))
+
+    def _reject(self, reason):
+        self.shed += 1
+        raise Overloaded(f"Server busy ({self.name}: {reason})", self.retry_after())
+
+    def enter(self, max_wait=MAX_WAIT):
+        with self.cond:
+            if self.active >= self.limit:
+                if self.waiting >= self.queue_size:
+                    self._reject("queue full")
+
+                self.queued += 1
+                self.waiting += 1
+                self.peak_waiting = max(self.peak_waiting, self.waiting)
+                give_up_at = time.monotonic() + max_wait
+                try:
+                    while self.active >= self.limit:
+                        remaining = give_up_at - time.monotonic()
+                        if remaining <= 0:
+                            self._reject("timed out waiting for a slot")
+                        self.cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+            self.active += 1
+            self.admitted += 1
+            self.peak_active = max(self.peak_active, self.active)
+
+    def leave(self, held):
+        with self.cond:
+            self.active -= 1
+            self.hold_seconds = 0.8 * self.hold_seconds + 0.2 * held
+            self.cond.notify()
+
+    def stats(self):
+        with self.cond:
+            return {
+                "limit": self.limit,
+                "queue_size": self.queue_size,
+                "active": self.active,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "shed": self.shed,
+                "peak_active": self.peak_active,
+                "peak_waiting": self.peak_waiting,
+                "hold_seconds": round(self.hold_seconds, 3),
+            }
+
+
+class AdmissionController:
+    """Per-endpoint and per-platform gates for expensive operations"""
+
+    def __init__(self, limits):
+        self.gates = {
+            name: Gate(name, concurrency, queued)
+            for name, (concurrency, queued) in limits.items()
+            if concurrency > 0
+        }
+
+    @contextmanager
+    def admit(self, endpoint, platform, max_wait=MAX_WAIT):
+        """Hold a slot on the platform gate, then the endpoint gate, if configured.
+
+        Raises Overloaded when either gate sheds the request.
+        """
+        gates = [
+            self.gates[name]
+            for name in (f"{endpoint}.{platform}", endpoint)
+            if name in self.gates
+        ]
+        entered = []
+        give_up_at = time.monotonic() + max_wait
+        try:
+            for gate in gates:
+                gate.enter(max(0.0, give_up_at - time.monotonic()))
+                entered.append((gate, time.monotonic()))
+            yield
+        finally:
+            for gate, since in reversed(entered):
+                gate.leave(time.monotonic() - since)
+
+    def stats(self):
+        return {name: gate.stats() for name, gate in self.gates.items()}
+
+
+controller = AdmissionController(
+    parse_admission_limits(os.environ.get("ADMISSION_LIMITS", DEFAULT_ADMISSION_LIMITS))
+)
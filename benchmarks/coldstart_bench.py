@@ -0,0 +1,121 @@
+"""Measure cold-start cost: import time and resident memory per module.
+
+Every measurement runs in a fresh interpreter, the way a serverless cold
+start does, and reports the median of several rounds. Besides the bare
+imports it times the first /health request and the first use of each
+platform, which is when the scraper modules and their sessions load.
+
+    python benchmarks/coldstart_bench.py --rounds 5 --budget-ms 250
+
+With --budget-ms the script exits non-zero when importing main.py takes
+longer than the budget, so it can guard the cold start in CI.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "flask",
+    "flask_cors",
+    "requests",
+    "sqlite3",
+    "transport",
+    "downloader",
+    "tiktokscrape",
+    "fbvideo",
+    "main",
+]
+
+# Timed after `import main`, each in its own interpreter
+SCENARIOS = {
+    "first /health": "main.app.test_client().get('/health')",
+    "first tiktok use": "main.get_scraper('tiktok')",
+    "first facebook use": "main.get_scraper('facebook')",
+}
+
+PROBE = """
+import os, sys, time, json
+sys.path.insert(0, {root!r})
+os.chdir({root!r})
+
+def rss():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        # ru_maxrss is KB on Linux, bytes on macOS; a peak, not current RSS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+setup = {setup!r}
+if setup:
+    exec(setup)
+before, started = rss(), time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "rss": rss() - before}}))
+"""
+
+
+def measure(statement, setup="", rounds=5):
+    samples = []
+    for _ in range(rounds):
+        code = PROBE.format(root=ROOT, setup=setup, statement=statement)
+        output = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True,
+            text=True,
+            check=True,
+            # Log records share stdout with the result; keep start-up INFO lines off it
+            env={**os.environ, "LOG_LEVEL": "WARNING"},
+        ).stdout
+        samples.append(json.loads(output))
+    return {
+        "ms": statistics.median(s["seconds"] for s in samples) * 1000,
+        "rss_mb": statistics.median(s["rss"] for s in samples) / (1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="fail when importing main.py takes longer than this",
+    )
+    args = parser.parse_args()
+
+    print(f"{'import / scenario':<24}{'time (ms)':>12}{'RSS (MB)':>12}")
+    results = {}
+    for module in MODULES:
+        results[module] = measure(f"import {module}", rounds=args.rounds)
+        print(
+            f"{module:<24}{results[module]['ms']:>12.1f}"
+            f"{results[module]['rss_mb']:>12.1f}"
+        )
+
+    for name, statement in SCENARIOS.items():
+        result = measure(statement, setup="import main", rounds=args.rounds)
+        print(f"{name:<24}{result['ms']:>12.1f}{result['rss_mb']:>12.1f}")
+
+    if args.budget_ms is not None:
+        spent = results["main"]["ms"]
+        if spent > args.budget_ms:
+            print(
+                f"main.py import took {spent:.1f}ms, over the {args.budget_ms}ms budget"
+            )
+            sys.exit(1)
+        print(f"main.py import within the {args.budget_ms}ms budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""Load-test the HTTP API against the local upstream stand-in.
+
+Starts benchmarks/upstream_standin.py and the app (pointed at it through
+UPSTREAM_OVERRIDE), then drives /api/video-info, /api/download and
+/api/proxy-video at rising concurrency and reports throughput and
+p50/p95/p99 latency for each step.
+
+    python benchmarks/load_test.py --concurrency 1,8,32 --duration 10
+
+The app runs on werkzeug's threaded server by default. Pass --app-cmd to
+compare serving configurations, e.g.
+
+    --app-cmd "gunicorn -w 4 -k gthread --threads 16 -b 127.0.0.1:{port} main:app"
+
+Environment variables (ADMISSION_LIMITS, EXTRACT_WORKERS, ...) are passed
+through to the app; RATE_LIMITS defaults to none so the stand-in is not
+throttled on our side. --json writes the results for later comparison.
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import upstream_standin
+
+ENDPOINTS = ("video-info", "download", "proxy-video")
+FIRST_VIDEO_ID = 7300000000000000000
+
+APP_SERVER = """
+import sys
+from werkzeug.serving import make_server
+import main
+make_server("127.0.0.1", int(sys.argv[1]), main.app, threaded=True).serve_forever()
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_standin(args):
+    standin_args = upstream_standin.build_parser().parse_args(
+        [
+            "--port",
+            "0",
+            "--latency-ms",
+            str(args.latency_ms),
+            "--error-rate",
+            str(args.error_rate),
+            "--video-mb",
+            str(args.video_mb),
+            "--page-kb",
+            str(args.page_kb),
+        ]
+    )
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=upstream_standin.serve, args=(standin_args, ready), daemon=True
+    )
+    process.start()
+    return process, f"http://127.0.0.1:{ready.get(timeout=10)}"
+
+
+def start_app(args, standin_url):
+    port = free_port()
+    env = dict(os.environ, UPSTREAM_OVERRIDE=standin_url)
+    env.setdefault("RATE_LIMITS", "")
+    if args.app_cmd:
+        command = shlex.split(args.app_cmd.format(port=port))
+    else:
+        command = [sys.executable, "-c", APP_SERVER, str(port)]
+    process = subprocess.Popen(
+        command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+    give_up_at = time.monotonic() + 30
+    while time.monotonic() < give_up_at:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("App did not come up within 30s")
+
+
+def video_url(args, rng):
+    video_id = FIRST_VIDEO_ID + rng.randrange(args.distinct_videos)
+    if rng.random() < args.facebook_share:
+        return "facebook", f"https://www.facebook.com/watch/?v={video_id}"
+    return "tiktok", f"https://www.tiktok.com/@standin/video/{video_id}"
+
+
+def next_request(endpoint, args, rng):
+    platform, url = video_url(args, rng)
+    if endpoint == "video-info":
+        return "/api/video-info", {"url": url}
+    if endpoint == "download":
+        quality = "no_watermark" if platform == "tiktok" else "hd"
+        return "/api/download", {"url": url, "quality": quality}
+    video_id = url.rsplit("/", 1)[-1].rsplit("=", 1)[-1]
+    cdn_url = f"https://v16-webapp.tiktokcdn.com/video/{video_id}/play.mp4"
+    return "/api/proxy-video", {"url": cdn_url}
+
+
+def drive(port, endpoint, args, stop_at, samples, seed):
+    rng = random.Random(seed)
+    buffer = bytearray(256 * 1024)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    while time.monotonic() < stop_at:
+        path, payload = next_request(endpoint, args, rng)
+        started = time.perf_counter()
+        received = 0
+        try:
+            conn.request(
+                "POST",
+                path,
+                body=json.dumps(payload),
+                headers={"Content-Type": "application/json"},
+            )
+            response = conn.getresponse()
+            while True:
+                n = response.readinto(buffer)
+                if not n:
+                    break
+                received += n
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            status = "connection error"
+        samples.append((time.perf_counter() - started, status, received))
+    conn.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def run_step(port, endpoint, concurrency, args):
+    samples = []
+    stop_at = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=drive, args=(port, endpoint, args, stop_at, samples, i))
+        for i in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(s[0] * 1000 for s in samples)
+    failures = {}
+    for _, status, _ in samples:
+        if status != 200:
+            failures[str(status)] = failures.get(str(status), 0) + 1
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "rps": len(samples) / elapsed,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "mb_per_s": sum(s[2] for s in samples) / elapsed / (1024 * 1024),
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--concurrency", default="1,4,16,64")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per step")
+    parser.add_argument(
+        "--distinct-videos",
+        type=int,
+        default=10000,
+        help="id pool size; smaller pools mean more cache and fan-out hits",
+    )
+    parser.add_argument("--facebook-share", type=float, default=0.2)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--video-mb", type=float, default=4)
+    parser.add_argument("--page-kb", type=float, default=512)
+    parser.add_argument(
+        "--app-cmd", help="serve the app with this; {port} is filled in"
+    )
+    parser.add_argument("--app-url", help="use an app that is already running")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    standin, standin_url = start_standin(args)
+    app = None
+    if args.app_url:
+        port = int(args.app_url.rsplit(":", 1)[-1].strip("/"))
+        print(f"Using running app; start it with UPSTREAM_OVERRIDE={standin_url}")
+    else:
+        app, port = start_app(args, standin_url)
+
+    results = []
+    try:
+        print(
+            f"{'endpoint':<13}{'conc':>5}{'reqs':>8}{'req/s':>9}{'p50 ms':>9}"
+            f"{'p95 ms':>9}{'p99 ms':>9}{'MB/s':>8}  failures"
+        )
+        for endpoint in args.endpoints.split(","):
+            for concurrency in map(int, args.concurrency.split(",")):
+                r = run_step(port, endpoint, concurrency, args)
+                results.append(r)
+                print(
+                    f"{endpoint:<13}{concurrency:>5}{r['requests']:>8}{r['rps']:>9.1f}"
+                    f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                    f"{r['mb_per_s']:>8.1f}  {r['failures'] or ''}"
+                )
+    finally:
+        if app:
+            app.terminate()
+            app.wait()
+        standin.terminate()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
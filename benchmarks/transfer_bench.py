@@ -0,0 +1,102 @@
+"""Benchmark the download copy loop against a local HTTP stand-in.
+
+Compares the old iter_content(8192) loop with transfer.copy_to_file and
+reports wall-clock MB/s and MB/s per core (bytes divided by the CPU time of
+the client process). The stand-in server runs in its own process so its CPU
+time is not counted.
+
+    python benchmarks/transfer_bench.py --size-mb 256 --rounds 3
+"""
+
+import argparse
+import os
+import sys
+import time
+import multiprocessing
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from transfer import copy_to_file
+
+
+def serve_blob(port_queue, size):
+    payload = memoryview(os.urandom(1024 * 1024))
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            remaining = size
+            while remaining:
+                block = payload[: min(len(payload), remaining)]
+                self.wfile.write(block)
+                remaining -= len(block)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def copy_iter_content(response, f):
+    for chunk in response.iter_content(chunk_size=8192):
+        if chunk:
+            f.write(chunk)
+
+
+def copy_transfer(response, f):
+    copy_to_file(response, f)
+
+
+def run(name, copy, session, url, size, rounds):
+    results = []
+    for _ in range(rounds):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        response = session.get(url, stream=True)
+        with open(os.devnull, "wb") as f:
+            copy(response, f)
+        response.close()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        results.append((size / wall / 1e6, size / max(cpu, 1e-9) / 1e6))
+
+    wall_rate = max(r[0] for r in results)
+    core_rate = max(r[1] for r in results)
+    print(f"{name:<24} {wall_rate:>10.1f} MB/s {core_rate:>12.1f} MB/s/core")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve_blob, args=(port_queue, size), daemon=True
+    )
+    server.start()
+    url = f"http://127.0.0.1:{port_queue.get()}/video.mp4"
+
+    session = requests.Session()
+    print(f"Transferring {args.size_mb} MB x {args.rounds} rounds (best shown)")
+    print(f"{'loop':<24} {'wall':>15} {'per core':>17}")
+    run("iter_content(8192)", copy_iter_content, session, url, size, args.rounds)
+    run("transfer.copy_to_file", copy_transfer, session, url, size, args.rounds)
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
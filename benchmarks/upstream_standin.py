@@ -0,0 +1,318 @@
+"""Local stand-in for the TikTok and Facebook hosts the scrapers talk to.
+
+Serves just enough of each upstream to drive main.py end to end without
+touching the real sites: the TikTok feed API, TikTok and Facebook video
+pages, vm.tiktok.com / fb.watch / share short links, and CDN video and
+thumbnail endpoints with Range support. Latency, error rate, throttling,
+page size and video size are configurable.
+
+    python benchmarks/upstream_standin.py --port 8900 --latency-ms 80 --error-rate 0.02
+
+Point the app at it with UPSTREAM_OVERRIDE=http://127.0.0.1:8900; transport
+then sends every upstream request here with the real host in
+X-Upstream-Host. benchmarks/load_test.py starts both for you.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+import zlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+BLOCK_SIZE = 1024 * 1024
+CDN_HOSTS = ("tiktokcdn.com", "tiktokcdn-us.com", "byteoversea.com", "fbcdn.net")
+SHORT_LINK_HOSTS = ("vm.tiktok.com", "vt.tiktok.com", "fb.watch")
+# Signed CDN URLs stay valid this long, like the real ones
+URL_LIFETIME = 6 * 3600
+# Soundtracks are served at this fraction of the video size, about the
+# ratio of a 128 kbps AAC track to a typical short-video stream
+AUDIO_SHARE = 0.1
+
+
+def video_id_for(code):
+    """Stable numeric id for a short-link code"""
+    return str(7000000000000000000 + zlib.crc32(code.encode()))
+
+
+def host_matches(host, suffixes):
+    return any(host == s or host.endswith("." + s) for s in suffixes)
+
+
+class StandIn:
+    def __init__(self, args):
+        self.args = args
+        self.block = memoryview(os.urandom(BLOCK_SIZE))
+        self.video_size = int(args.video_mb * 1024 * 1024)
+        self.page_padding = " " * int(args.page_kb * 1024)
+        self.thumbnail = b"\xff\xd8\xff\xe0" + os.urandom(args.thumbnail_kb * 1024)
+
+    def tiktok_cdn_url(self, video_id, variant):
+        expires = int(time.time()) + URL_LIFETIME
+        return (
+            f"https://v16-webapp.tiktokcdn.com/video/{video_id}/{variant}.mp4"
+            f"?x-expires={expires}&vr={variant}"
+        )
+
+    def fb_cdn_url(self, video_id, variant, ext="mp4"):
+        expires = format(int(time.time()) + URL_LIFETIME, "x")
+        return f"https://video.xx.fbcdn.net/v/t42/{video_id}_{variant}.{ext}?oe={expires}&_nc_ht=video"
+
+    def aweme(self, video_id):
+        return {
+            "aweme_id": video_id,
+            "desc": f"Stand-in TikTok video {video_id}",
+            "author": {"nickname": "standin", "unique_id": "standin"},
+            "statistics": {"play_count": 1000, "digg_count": 100},
+            "video": {
+                "play_addr": {"url_list": [self.tiktok_cdn_url(video_id, "play")]},
+                "download_addr": {
+                    "url_list": [self.tiktok_cdn_url(video_id, "download")]
+                },
+                "cover": {"url_list": [self.tiktok_cdn_url(video_id, "cover")]},
+                "duration": 15000,
+                "width": 1080,
+                "height": 1920,
+            },
+            "music": {
+                "title": "original sound",
+                "play_url": {"url_list": [self.tiktok_cdn_url(video_id, "music")]},
+            },
+        }
+
+    def tiktok_page(self, video_id):
+        aweme = self.aweme(video_id)
+        item = {
+            "id": video_id,
+            "desc": aweme["desc"],
+            "author": aweme["author"],
+            "video": {
+                "playAddr": aweme["video"]["play_addr"]["url_list"][0],
+                "downloadAddr": aweme["video"]["download_addr"]["url_list"][0],
+                "cover": aweme["video"]["cover"]["url_list"][0],
+                "duration": 15,
+                "width": 1080,
+                "height": 1920,
+            },
+        }
+        state = {
+            "__DEFAULT_SCOPE__": {
+                "webapp.video-detail": {"itemInfo": {"itemStruct": item}}
+            }
+        }
+        return (
+            "<!DOCTYPE html><html><head><title>TikTok</title></head><body>"
+            f"<!--{self.page_padding}-->"
+            '<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">'
+            f"{json.dumps(state)}</script></body></html>"
+        )
+
+    def facebook_page(self, video_id):
+        def escaped(url):
+            return url.replace("/", "\\/").replace("&", "\\u0026")
+
+        hd = escaped(self.fb_cdn_url(video_id, "hd"))
+        sd = escaped(self.fb_cdn_url(video_id, "sd"))
+        thumb = escaped(self.fb_cdn_url(video_id, "thumb", "jpg"))
+        audio = escaped(self.fb_cdn_url(video_id, "audio"))
+        return (
+            "<!DOCTYPE html><html><head><title>Facebook</title></head><body>"
+            f"<!--{self.page_padding}-->"
+            "<script>{"
+            f'"playable_url_quality_hd":"{hd}","playable_url_quality_sd":"{sd}",'
+            f'"title":"Stand-in Facebook video {video_id}",'
+            '"owner":{"name":"Stand-in Page"},'
+            '"playable_duration_in_ms":42000,'
+            f'"preferred_thumbnail":{{"image":{{"uri":"{thumb}"}}}},'
+            '"all_video_dash_prefetch_representations":[{"representations":['
+            f'{{"mime_type":"audio\\/mp4","codecs":"mp4a.40.5","base_url":"{audio}",'
+            '"bandwidth":65000}]}]'
+            "}</script></body></html>"
+        )
+
+
+def make_handler(standin):
+    args = standin.args
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *a):
+            pass
+
+        def do_HEAD(self):
+            self.handle_request(head=True)
+
+        def do_GET(self):
+            self.handle_request(head=False)
+
+        def send_body(self, status, body, content_type, head=False, headers=None):
+            if isinstance(body, str):
+                body = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+
+        def redirect(self, location):
+            self.send_response(302)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def handle_request(self, head):
+            host = (self.headers.get("X-Upstream-Host") or "").lower()
+            parsed = urlparse(self.path)
+            path, query = parsed.path, parse_qs(parsed.query)
+
+            latency = max(0.0, random.gauss(args.latency_ms, args.jitter_ms)) / 1000
+            time.sleep(latency)
+
+            if host_matches(host, CDN_HOSTS):
+                return self.serve_cdn(path, head)
+
+            roll = random.random()
+            if roll < args.throttle_rate:
+                return self.send_body(
+                    429, "{}", "application/json", head, {"Retry-After": "1"}
+                )
+            if roll < args.throttle_rate + args.error_rate:
+                return self.send_body(500, "upstream error", "text/plain", head)
+
+            if host in SHORT_LINK_HOSTS or "/share/r/" in path:
+                code = path.rstrip("/").rsplit("/", 1)[-1]
+                if "tiktok" in host:
+                    return self.redirect(
+                        f"https://www.tiktok.com/@standin/video/{video_id_for(code)}"
+                    )
+                return self.redirect(
+                    f"https://www.facebook.com/reel/{video_id_for(code)}"
+                )
+
+            if host_matches(host, ("tiktokv.com",)) and path.startswith("/aweme/"):
+                video_id = query.get("aweme_id", ["0"])[0]
+                body = json.dumps({"aweme_list": [standin.aweme(video_id)]})
+                return self.send_body(200, body, "application/json", head)
+
+            if host_matches(host, ("tiktok.com",)):
+                match = re.search(r"/video/(\d+)", path)
+                if match:
+                    page = standin.tiktok_page(match.group(1))
+                    return self.send_body(200, page, "text/html", head)
+
+            if host_matches(host, ("facebook.com",)):
+                match = re.search(r"/(?:reel|videos|stories)/(\d+)", path) or (
+                    re.search(r"(\d{5,})", parsed.query)
+                )
+                if match:
+                    page = standin.facebook_page(match.group(1))
+                    return self.send_body(200, page, "text/html", head)
+
+            self.send_body(404, "not found", "text/plain", head)
+
+        def serve_cdn(self, path, head):
+            if path.endswith((".jpg", ".jpeg")) or "/cover" in path:
+                return self.send_body(200, standin.thumbnail, "image/jpeg", head)
+
+            size = standin.video_size
+            if "/music" in path or "_audio" in path:
+                size = max(1, int(size * AUDIO_SHARE))
+            start, end = 0, size - 1
+            match = re.match(r"bytes=(\d*)-(\d*)", self.headers.get("Range", ""))
+            if match and (match.group(1) or match.group(2)):
+                if match.group(1):
+                    start = int(match.group(1))
+                    end = min(int(match.group(2) or end), size - 1)
+                else:
+                    start = max(0, size - int(match.group(2)))
+                if start >= size:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            else:
+                self.send_response(200)
+
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", f'"{size:x}"')
+            self.end_headers()
+            if not head:
+                self.stream_bytes(start, end + 1)
+
+        def stream_bytes(self, start, stop):
+            # Bytes are a pure function of the offset so ranges stitch together
+            pace = args.cdn_mbps * 1024 * 1024 / 8 if args.cdn_mbps else None
+            started = time.monotonic()
+            sent = 0
+            offset = start
+            while offset < stop:
+                at = offset % BLOCK_SIZE
+                n = min(stop - offset, BLOCK_SIZE - at, 256 * 1024)
+                self.wfile.write(standin.block[at : at + n])
+                offset += n
+                sent += n
+                if pace:
+                    ahead = sent / pace - (time.monotonic() - started)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    return Handler
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of page/API 500s"
+    )
+    parser.add_argument(
+        "--throttle-rate", type=float, default=0.0, help="share of page/API 429s"
+    )
+    parser.add_argument("--video-mb", type=float, default=4)
+    parser.add_argument("--page-kb", type=float, default=512)
+    parser.add_argument("--thumbnail-kb", type=int, default=32)
+    parser.add_argument(
+        "--cdn-mbps",
+        type=float,
+        default=0,
+        help="per-stream CDN bandwidth, 0 = unlimited",
+    )
+    return parser
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Range probes and cancelled downloads drop connections mid-stream
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def serve(args, ready=None):
+    server = StandInServer((args.host, args.port), make_handler(StandIn(args)))
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    print(f"Upstream stand-in listening on http://{args.host}:{args.port}")
+    serve(args)
@@ -0,0 +1,115 @@
+"""Fingerprint and precompress the files in static/ for long-lived caching.
+
+Run before deploying:
+
+    python build_assets.py
+
+Writes static/dist/<name>.<hash>.<ext> for every file in static/, gzip
+(.gz) and, when the brotli package is installed, brotli (.br) variants
+of text assets, and static/dist/manifest.json mapping each source name to
+its fingerprinted name. main.py serves the result from /assets/ and the
+template picks the names up through asset_url().
+
+static/dist is committed, because the Vercel Python builder has no build
+step to create it. Rebuild and commit it with every change to static/;
+
+    python build_assets.py --check
+
+exits non-zero when the committed files no longer match their sources.
+"""
+
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_NAME = "manifest.json"
+COMPRESSIBLE = (".js", ".css", ".html", ".svg", ".json", ".txt")
+# A variant that saves less than this is not worth a second file
+MIN_SAVING = 0.05
+
+
+def fingerprint(name, data):
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def build(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.makedirs(dist_dir)
+
+    manifest = {}
+    for name in sorted(os.listdir(static_dir)):
+        path = os.path.join(static_dir, name)
+        if not os.path.isfile(path):
+            continue
+
+        with open(path, "rb") as f:
+            data = f.read()
+        hashed = fingerprint(name, data)
+        _write(os.path.join(dist_dir, hashed), data)
+        manifest[name] = hashed
+
+        sizes = [f"{len(data)} B"]
+        if name.endswith(COMPRESSIBLE):
+            variants = [("gz", gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(("br", brotli.compress(data, quality=11)))
+            for suffix, compressed in variants:
+                if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                    _write(os.path.join(dist_dir, f"{hashed}.{suffix}"), compressed)
+                    sizes.append(f"{suffix} {len(compressed)} B")
+
+        print(f"{name} -> {hashed} ({', '.join(sizes)})")
+
+    with open(os.path.join(dist_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if brotli is None:
+        print("brotli is not installed, only gzip variants were written")
+    return manifest
+
+
+def stale_assets(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Source files whose fingerprinted copy in dist_dir is missing or outdated"""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    stale = []
+    for name in sorted(os.listdir(static_dir)):
+        path = os.path.join(static_dir, name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            hashed = fingerprint(name, f.read())
+        if manifest.get(name) != hashed or not os.path.exists(
+            os.path.join(dist_dir, hashed)
+        ):
+            stale.append(name)
+    return stale
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv[1:]:
+        stale = stale_assets()
+        for name in stale:
+            print(f"{name} is out of date in static/dist")
+        sys.exit(1 if stale else 0)
+    build()
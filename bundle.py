@@ -0,0 +1,102 @@
+import io
+import json
+import time
+import zipfile
+import threading
+from datetime import datetime
+
+MANIFEST_NAME = "manifest.json"
+
+_lock = threading.Lock()
+_counts = {"bundles": 0, "entries": 0, "failed_entries": 0, "bytes": 0}
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands what is written to the generator draining it.
+
+    It cannot seek, so zipfile writes each entry's CRC and sizes in a data
+    descriptor after the data instead of going back to patch the header.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries):
+    """Yield a ZIP archive of stored entries as their bytes arrive.
+
+    entries yields (name, chunks, size) with size None when it is unknown.
+    Only the chunk being written is held in memory and nothing touches the
+    disk. Unknown sizes get ZIP64 sizes so entries past 4 GiB stay valid.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+        for name, chunks, size in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            if size is not None:
+                info.file_size = size
+            with archive.open(info, "w", force_zip64=size is None) as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    # Closing the archive wrote the central directory
+    yield sink.drain()
+
+
+class UniqueNames:
+    """Hands out archive member names, numbering repeats"""
+
+    def __init__(self):
+        self._taken = {MANIFEST_NAME}
+
+    def claim(self, name):
+        stem, dot, extension = name.rpartition(".")
+        if not dot:
+            stem, extension = name, ""
+        candidate, n = name, 1
+        while candidate in self._taken:
+            n += 1
+            candidate = f"{stem}-{n}{dot}{extension}"
+        self._taken.add(candidate)
+        return candidate
+
+
+def manifest_entry(records):
+    """The manifest member: one record per requested item, in request order"""
+    failed = [r for r in records if r.get("status") != "ok"]
+    with _lock:
+        _counts["bundles"] += 1
+        _counts["entries"] += len(records) - len(failed)
+        _counts["failed_entries"] += len(failed)
+        _counts["bytes"] += sum(r.get("bytes", 0) for r in records)
+
+    data = json.dumps(
+        {
+            "created": datetime.now().isoformat(),
+            "requested": len(records),
+            "succeeded": len(records) - len(failed),
+            "failed": len(failed),
+            "items": sorted(records, key=lambda r: r["index"]),
+        },
+        indent=2,
+    ).encode()
+    return MANIFEST_NAME, [data], len(data)
+
+
+def stats():
+    with _lock:
+        return dict(_counts)
@@ -0,0 +1,94 @@
+import os
+import gzip
+import time
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Below this the headers cost more than compression saves
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+# Brotli 4-5 beats gzip 6 on both size and speed for small JSON bodies
+BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "4"))
+# Video and event streams are either incompressible or must not be buffered
+COMPRESSIBLE_TYPES = ("application/json",)
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _encoders():
+    if brotli is not None:
+        yield "br", lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    yield "gzip", lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _record(name, bytes_in=0, bytes_out=0, cpu_seconds=0.0):
+    with _lock:
+        stats = _stats.setdefault(
+            name, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+        )
+        stats["responses"] += 1
+        stats["bytes_in"] += bytes_in
+        stats["bytes_out"] += bytes_out
+        stats["cpu_seconds"] += cpu_seconds
+
+
+def compress_response(response, accept_encodings):
+    """Compress a buffered JSON response for a client that accepts it"""
+    if (
+        response.mimetype not in COMPRESSIBLE_TYPES
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+        or not 200 <= response.status_code < 300
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        _record("skipped_small")
+        return response
+
+    for encoding, compress in _encoders():
+        if not accept_encodings[encoding]:
+            continue
+
+        started = time.thread_time()
+        compressed = compress(data)
+        _record(encoding, len(data), len(compressed), time.thread_time() - started)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        # The encoded body is a different byte sequence from the one hashed
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    _record("identity")
+    return response
+
+
+def stats():
+    with _lock:
+        snapshot = {name: dict(values) for name, values in _stats.items()}
+
+    for values in snapshot.values():
+        if values["bytes_in"]:
+            values["ratio"] = round(values["bytes_out"] / values["bytes_in"], 3)
+            values["cpu_us_per_kb"] = round(
+                values["cpu_seconds"] * 1e6 / (values["bytes_in"] / 1024), 1
+            )
+        values["cpu_seconds"] = round(values["cpu_seconds"], 4)
+
+    return {
+        "min_size": MIN_SIZE,
+        "gzip_level": GZIP_LEVEL,
+        "brotli_quality": BROTLI_QUALITY if brotli is not None else None,
+        "encodings": snapshot,
+    }
@@ -0,0 +1,38 @@
+import time
+
+# A network call with less budget than this left is not worth starting
+MIN_CALL_BUDGET = 1.0
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """Time budget for one request, shared by every stage that serves it.
+
+    Deadline(None) never expires, so scrapers can take an optional deadline
+    and treat both cases the same way.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def allows(self, seconds=MIN_CALL_BUDGET):
+        return self.remaining() >= seconds
+
+    def timeout(self, cap):
+        """Timeout for one call: the stage's own cap or what is left, if smaller"""
+        remaining = self.remaining()
+        if remaining < MIN_CALL_BUDGET:
+            raise DeadlineExceeded(f"Only {remaining:.1f}s of request budget left")
+        return min(cap, remaining)
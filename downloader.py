@@ -0,0 +1,573 @@
+import os
+import logging
+import re
+import json
+import time
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from transfer import copy_to_file, read_chunks
+
+log = logging.getLogger(__name__)
+
+# Files smaller than this are not worth the extra range requests
+SEGMENT_MIN_SIZE = 8 * 1024 * 1024
+SEGMENT_SIZE = 4 * 1024 * 1024
+SEGMENT_WORKERS = 4
+SEGMENT_RETRIES = 3
+
+PARTIAL_DIR = os.environ.get("PARTIAL_DIR") or os.path.join(
+    tempfile.gettempdir(), "biartik-partials"
+)
+PARTIAL_TTL = 3600
+RESUME_ATTEMPTS = 2
+
+_write_lock = threading.Lock()
+# resume key -> [lock, holders]; an entry goes once its last holder is done
+_partial_locks = {}
+_partial_locks_guard = threading.Lock()
+_last_sweep = 0
+
+
+def _write_at(fd, data, offset):
+    if hasattr(os, "pwrite"):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+        return
+
+    with _write_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)
+
+
+def probe_range_support(session, url, headers=None, timeout=15):
+    """Probe whether the server honours byte ranges.
+
+    A one-byte range request is used instead of HEAD because several CDNs
+    answer HEAD with `Accept-Ranges: bytes` but then ignore the Range header,
+    while a 206 with a Content-Range total is proof that ranges really work.
+    Returns a dict with total_size (None without range support), the final
+    URL after redirects and the ETag / Last-Modified validators.
+    """
+    probe_headers = dict(headers or {})
+    probe_headers["Range"] = "bytes=0-0"
+    probe_headers["Accept-Encoding"] = "identity"
+
+    response = session.get(
+        url, headers=probe_headers, stream=True, timeout=timeout, allow_redirects=True
+    )
+    try:
+        info = {
+            "total_size": None,
+            "url": response.url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+        if response.status_code == 206:
+            match = re.match(
+                r"bytes\s+0-0/(\d+)", response.headers.get("Content-Range", "")
+            )
+            if match:
+                info["total_size"] = int(match.group(1))
+
+        return info
+    finally:
+        response.close()
+
+
+def _range_start(response):
+    match = re.match(r"bytes\s+(\d+)-", response.headers.get("Content-Range", ""))
+    return int(match.group(1)) if match else None
+
+
+def _validator(info):
+    etag = info.get("etag")
+    # If-Range requires a strong validator
+    if etag and not etag.startswith("W/"):
+        return etag
+    return info.get("last_modified")
+
+
+class PartialDownload:
+    """An interrupted download kept on disk so a retry can continue it.
+
+    Partials are keyed by video id and variant rather than by URL, because
+    every resolution hands out a freshly signed CDN URL for the same file.
+    The ETag / Last-Modified validator recorded with the partial decides
+    whether the bytes already on disk still belong to the current file.
+    """
+
+    def __init__(self, key):
+        safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+        self.key = key
+        self.data_path = os.path.join(PARTIAL_DIR, f"{safe_key}.part")
+        self.meta_path = os.path.join(PARTIAL_DIR, f"{safe_key}.json")
+        self.meta = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            self.meta = {}
+        if not os.path.exists(self.data_path):
+            self.meta = {}
+        return self.meta
+
+    def save(self):
+        with self._lock:
+            temp_path = f"{self.meta_path}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(self.meta, f)
+            os.replace(temp_path, self.meta_path)
+
+    def matches(self, info):
+        validator = _validator(info)
+        return (
+            bool(validator)
+            and self.meta.get("validator") == validator
+            and self.meta.get("total_size") == info.get("total_size")
+            and self.meta.get("segment_size") == SEGMENT_SIZE
+        )
+
+    def reset(self, info):
+        os.makedirs(PARTIAL_DIR, exist_ok=True)
+        try:
+            os.unlink(self.data_path)
+        except OSError:
+            pass
+        self.meta = {
+            "validator": _validator(info),
+            "total_size": info.get("total_size"),
+            "segment_size": SEGMENT_SIZE,
+            "segments": [],
+        }
+        self.save()
+
+    def confirmed_bytes(self):
+        try:
+            return os.path.getsize(self.data_path)
+        except OSError:
+            return 0
+
+    def completed_segments(self):
+        return set(self.meta.get("segments", []))
+
+    def mark_segment(self, start):
+        with self._lock:
+            self.meta.setdefault("segments", []).append(start)
+        self.save()
+
+    def discard(self):
+        for path in (self.data_path, self.meta_path):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def finish(self):
+        """Hand the completed file over as a fresh temp file."""
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+        temp_file.close()
+        shutil.move(self.data_path, temp_file.name)
+        self.discard()
+        return temp_file.name
+
+
+@contextmanager
+def _partial_lock(key):
+    with _partial_locks_guard:
+        entry = _partial_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _partial_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _partial_locks[key]
+
+
+def sweep_partials(max_age=PARTIAL_TTL):
+    """Remove partial downloads nobody has touched for max_age seconds"""
+    global _last_sweep
+
+    now = time.time()
+    if now - _last_sweep < 60:
+        return
+    _last_sweep = now
+
+    try:
+        names = os.listdir(PARTIAL_DIR)
+    except OSError:
+        return
+
+    for name in names:
+        path = os.path.join(PARTIAL_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                os.unlink(path)
+        except OSError:
+            pass
+
+
+class ByteCounter:
+    """Running byte total shared by segment threads, reported to a callback.
+
+    With a spool (a fanout.SharedTransfer) every write is also recorded by
+    offset, so other requests can read the file while it is being filled.
+    """
+
+    def __init__(self, callback=None, total=None, spool=None):
+        self.callback = callback
+        self.total = total
+        self.spool = spool
+        self.done = 0
+        self._lock = threading.Lock()
+
+    def start(self, path):
+        """Announce the file the bytes are about to be written to"""
+        if self.spool:
+            self.spool.start(path, self.total)
+
+    def wrote(self, offset, nbytes):
+        if self.spool:
+            self.spool.written(offset, nbytes)
+        self.add(nbytes)
+
+    def sequential(self, offset=0):
+        """on_chunk callback for a file written front to back from offset"""
+        position = [offset]
+
+        def on_chunk(nbytes):
+            self.wrote(position[0], nbytes)
+            position[0] += nbytes
+
+        return on_chunk
+
+    def add(self, nbytes):
+        if not self.callback:
+            return
+        with self._lock:
+            self.done += nbytes
+            done = self.done
+        self.callback(bytes=done, total=self.total)
+
+
+def _fetch_segment(session, url, headers, fd, start, end, timeout, counter):
+    segment_headers = dict(headers or {})
+    segment_headers["Range"] = f"bytes={start}-{end}"
+    segment_headers["Accept-Encoding"] = "identity"
+
+    response = session.get(url, headers=segment_headers, stream=True, timeout=timeout)
+    try:
+        if response.status_code != 206:
+            raise IOError(f"Range request returned HTTP {response.status_code}")
+
+        offset = start
+        try:
+            for view in read_chunks(response):
+                if offset + len(view) > end + 1:
+                    raise IOError(f"Segment {start}-{end} received too many bytes")
+                _write_at(fd, view, offset)
+                counter.wrote(offset, len(view))
+                offset += len(view)
+
+            if offset != end + 1:
+                raise IOError(
+                    f"Segment {start}-{end} ended early after {offset - start} bytes"
+                )
+        except BaseException:
+            # The retry fetches this segment from its start again
+            counter.add(start - offset)
+            raise
+        return end + 1 - start
+    finally:
+        response.close()
+
+
+def _fetch_segment_with_retry(
+    session, url, headers, fd, start, end, timeout, counter, partial=None
+):
+    for attempt in range(1, SEGMENT_RETRIES + 1):
+        try:
+            received = _fetch_segment(
+                session, url, headers, fd, start, end, timeout, counter
+            )
+            if partial:
+                partial.mark_segment(start)
+            return received
+        except (requests.RequestException, IOError) as e:
+            if attempt == SEGMENT_RETRIES:
+                raise
+            log.warning(
+                "Segment failed, retrying",
+                extra={"start": start, "end": end, "attempt": attempt, "error": str(e)},
+            )
+            time.sleep(0.5 * attempt)
+
+
+def download_segmented(
+    session,
+    url,
+    headers,
+    path,
+    total_size,
+    timeout=60,
+    segment_size=SEGMENT_SIZE,
+    workers=SEGMENT_WORKERS,
+    partial=None,
+    counter=None,
+):
+    segments = [
+        (start, min(start + segment_size, total_size) - 1)
+        for start in range(0, total_size, segment_size)
+    ]
+    completed = set()
+    if partial:
+        completed = partial.completed_segments()
+        headers = dict(headers or {})
+        headers["If-Range"] = partial.meta["validator"]
+    pending = [(start, end) for start, end in segments if start not in completed]
+    if completed:
+        log.info(
+            "Resuming segmented download",
+            extra={"pending": len(pending), "segments": len(segments)},
+        )
+
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0))
+    try:
+        os.ftruncate(fd, total_size)
+
+        counter = counter or ByteCounter()
+        counter.total = total_size
+        counter.start(path)
+        received = 0
+        for start, end in segments:
+            if start in completed:
+                counter.wrote(start, end + 1 - start)
+                received += end + 1 - start
+        executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending))))
+        try:
+            futures = [
+                executor.submit(
+                    _fetch_segment_with_retry,
+                    session,
+                    url,
+                    headers,
+                    fd,
+                    start,
+                    end,
+                    timeout,
+                    counter,
+                    partial,
+                )
+                for start, end in pending
+            ]
+            received += sum(future.result() for future in futures)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if received != total_size or os.fstat(fd).st_size != total_size:
+            raise IOError(
+                f"Downloaded {received} bytes but server reported {total_size}"
+            )
+    finally:
+        os.close(fd)
+
+
+def download_single_stream(session, url, headers, path, timeout=60, counter=None):
+    counter = counter or ByteCounter()
+    response = session.get(url, stream=True, headers=headers, timeout=timeout)
+    try:
+        response.raise_for_status()
+        content_length = response.headers.get("Content-Length", "")
+        if content_length.isdigit() and not response.headers.get("Content-Encoding"):
+            counter.total = int(content_length)
+        with open(path, "wb") as f:
+            counter.start(path)
+            copy_to_file(response, f, counter.sequential())
+    finally:
+        response.close()
+
+
+def _download_single_resumable(
+    session, url, headers, partial, total_size, timeout, counter
+):
+    offset = partial.confirmed_bytes()
+    if offset >= total_size:
+        offset = 0
+
+    request_headers = dict(headers or {})
+    request_headers["Accept-Encoding"] = "identity"
+    if offset:
+        request_headers["Range"] = f"bytes={offset}-"
+        request_headers["If-Range"] = partial.meta["validator"]
+        log.info("Resuming download", extra={"offset": offset, "total": total_size})
+
+    response = session.get(url, headers=request_headers, stream=True, timeout=timeout)
+    if response.status_code == 206 and _range_start(response) != offset:
+        # Some proxies answer 206 from another position than asked; appending
+        # that would shift the file, so fetch the whole thing instead
+        log.info(
+            "Range answered from the wrong offset, restarting",
+            extra={"offset": offset, "range": response.headers.get("Content-Range")},
+        )
+        response.close()
+        offset = 0
+        request_headers.pop("Range", None)
+        request_headers.pop("If-Range", None)
+        response = session.get(
+            url, headers=request_headers, stream=True, timeout=timeout
+        )
+    try:
+        response.raise_for_status()
+        if response.status_code != 206:
+            # Validator no longer matches, the server sent the whole file
+            offset = 0
+        elif _range_start(response) != offset:
+            raise IOError(f"Server sent {response.headers.get('Content-Range')}")
+
+        counter.total = total_size
+        mode = "r+b" if os.path.exists(partial.data_path) else "wb"
+        with open(partial.data_path, mode) as f:
+            f.seek(offset)
+            f.truncate()
+            counter.start(partial.data_path)
+            if offset:
+                counter.wrote(0, offset)
+            copy_to_file(response, f, counter.sequential(offset))
+    finally:
+        response.close()
+
+    if partial.confirmed_bytes() != total_size:
+        raise IOError(
+            f"Downloaded {partial.confirmed_bytes()} bytes but server reported {total_size}"
+        )
+
+
+def _download_resumable(session, url, headers, timeout, partial, counter):
+    info = None
+    try:
+        info = probe_range_support(session, url, headers, timeout=min(timeout, 15))
+    except requests.RequestException as e:
+        log.info("Range probe failed, using single stream", extra={"error": str(e)})
+
+    if not info or not info["total_size"] or not _validator(info):
+        # Without ranges and a validator nothing on disk can be trusted
+        partial.discard()
+        return _download_fresh(session, url, headers, timeout, info, counter)
+
+    partial.load()
+    if not partial.matches(info):
+        partial.reset(info)
+
+    total_size = info["total_size"]
+    if total_size >= SEGMENT_MIN_SIZE:
+        download_segmented(
+            session,
+            info["url"],
+            headers,
+            partial.data_path,
+            total_size,
+            timeout,
+            partial=partial,
+            counter=counter,
+        )
+    else:
+        _download_single_resumable(
+            session, info["url"], headers, partial, total_size, timeout, counter
+        )
+
+    return partial.finish()
+
+
+def _download_fresh(session, url, headers, timeout, info=None, counter=None):
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+    temp_file.close()
+
+    try:
+        total_size = info["total_size"] if info else None
+        if total_size and total_size >= SEGMENT_MIN_SIZE:
+            download_segmented(
+                session,
+                info["url"],
+                headers,
+                temp_file.name,
+                total_size,
+                timeout,
+                counter=counter,
+            )
+        else:
+            download_single_stream(
+                session, url, headers, temp_file.name, timeout, counter
+            )
+
+        return temp_file.name
+    except BaseException:
+        try:
+            os.unlink(temp_file.name)
+        except OSError:
+            pass
+        raise
+
+
+def download_to_temp(
+    session,
+    url,
+    headers=None,
+    timeout=60,
+    resume_key=None,
+    on_progress=None,
+    spool=None,
+):
+    """Download a video into a temporary .mp4 file and return its path.
+
+    Large files on servers that support byte ranges are fetched as parallel
+    segments; everything else goes through a single stream. With a
+    resume_key (video id plus variant) an interrupted transfer is kept on
+    disk, and both the retry here and any later request for the same key
+    continue from the last confirmed byte. on_progress, if given, is called
+    with bytes= and total= keyword arguments as data arrives, and a spool
+    (fanout.SharedTransfer) is told which bytes have reached the file.
+    """
+    if not resume_key:
+        info = None
+        try:
+            info = probe_range_support(session, url, headers, timeout=min(timeout, 15))
+        except requests.RequestException as e:
+            log.info("Range probe failed, using single stream", extra={"error": str(e)})
+        return _download_fresh(
+            session, url, headers, timeout, info, ByteCounter(on_progress, spool=spool)
+        )
+
+    sweep_partials()
+    with _partial_lock(resume_key):
+        partial = PartialDownload(resume_key)
+        for attempt in range(1, RESUME_ATTEMPTS + 1):
+            try:
+                return _download_resumable(
+                    session,
+                    url,
+                    headers,
+                    timeout,
+                    partial,
+                    ByteCounter(on_progress, spool=spool),
+                )
+            except (requests.RequestException, IOError) as e:
+                if attempt == RESUME_ATTEMPTS:
+                    raise
+                log.warning(
+                    "Download attempt failed, resuming",
+                    extra={"attempt": attempt, "error": str(e)},
+                )
@@ -0,0 +1,139 @@
+import os
+import logging
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+log = logging.getLogger(__name__)
+
+# Worker processes for page scanning; 0 scans inline on the request thread
+WORKERS = int(os.environ.get("EXTRACT_WORKERS", "0"))
+# Smaller pages scan faster inline than the round trip to a worker costs
+MIN_OFFLOAD_SIZE = int(os.environ.get("EXTRACT_MIN_OFFLOAD_BYTES", str(64 * 1024)))
+# Pages at least this large go through shared memory instead of the pool's pipe
+SHARED_MEMORY_SIZE = int(os.environ.get("EXTRACT_SHARED_MEMORY_BYTES", str(256 * 1024)))
+TIMEOUT = float(os.environ.get("EXTRACT_TIMEOUT", "10"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "inline": 0,
+    "offloaded": 0,
+    "shared_memory": 0,
+    "fallbacks": 0,
+    "timeouts": 0,
+    "offload_seconds": 0.0,
+}
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _get_pool():
+    global _pool
+    if WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # Forking a process that runs request threads can copy a held
+            # lock into the child, so workers start from a fresh interpreter
+            _pool = ProcessPoolExecutor(
+                max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def _reset_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _scan_shared(scan, name, size):
+    """Worker side: decode the page straight out of the shared block"""
+    # Pool workers share the parent's resource tracker, so attaching here
+    # does not make the block outlive the caller's unlink
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        view = block.buf[:size]
+        try:
+            text = str(view, "utf-8")
+        finally:
+            view.release()
+    finally:
+        block.close()
+    return scan(text)
+
+
+def _submit(pool, scan, text):
+    """Returns the result of scan(text) from a worker process"""
+    if len(text) < SHARED_MEMORY_SIZE:
+        return pool.submit(scan, text).result(timeout=TIMEOUT)
+
+    data = text.encode("utf-8")
+    size = len(data)
+    # Some platforms round the block up to a page; the worker gets the real size
+    block = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        block.buf[:size] = data
+        del data
+        future = pool.submit(_scan_shared, scan, block.name, size)
+        result = future.result(timeout=TIMEOUT)
+        _count("shared_memory")
+        return result
+    finally:
+        block.close()
+        block.unlink()
+
+
+def run(scan, text):
+    """scan(text), on a worker process when the pool is enabled and text is large.
+
+    scan must be a module-level function so it can be pickled by name, and
+    should return something small: only its result crosses back. If the pool
+    is unavailable the scan runs inline, so callers see the same result
+    either way; a scan that overruns TIMEOUT raises TimeoutError.
+    """
+    pool = _get_pool()
+    if pool is None or len(text) < MIN_OFFLOAD_SIZE:
+        _count("inline")
+        return scan(text)
+
+    started = time.monotonic()
+    try:
+        result = _submit(pool, scan, text)
+    except TimeoutError:
+        _count("timeouts")
+        raise
+    except (BrokenProcessPool, OSError) as e:
+        log.warning(
+            "Extraction pool unavailable, scanning inline", extra={"error": str(e)}
+        )
+        if isinstance(e, BrokenProcessPool):
+            _reset_pool(pool)
+        _count("fallbacks")
+        return scan(text)
+
+    _count("offloaded")
+    _count("offload_seconds", time.monotonic() - started)
+    return result
+
+
+def stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+    snapshot["offload_seconds"] = round(snapshot["offload_seconds"], 3)
+    return {
+        "workers": WORKERS,
+        "min_offload_size": MIN_OFFLOAD_SIZE,
+        "shared_memory_size": SHARED_MEMORY_SIZE,
+        **snapshot,
+    }
@@ -0,0 +1,230 @@
+import os
+import logging
+import time
+import threading
+import contextvars
+
+import progress
+from transfer import MAX_CHUNK_SIZE
+
+log = logging.getLogger(__name__)
+
+# How often a waiting job reports how far the shared download has got
+WAIT_REPORT_INTERVAL = 0.25
+
+_transfers = {}
+_lock = threading.Lock()
+_counts = {"started": 0, "joined": 0}
+
+
+class SharedTransfer:
+    """One upstream download that any number of requests read at once.
+
+    The downloader reports every write by offset; the longest run of bytes
+    from the start of the file is what readers may consume. Segments arrive
+    out of order, so that prefix grows in bursts as each segment completes.
+    A reader that attaches late replays the spool file from disk and then
+    follows the live tail.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.path = None
+        self.total = None
+        self.available = 0
+        self.done = False
+        self.error = None
+        self.cancelled = False
+        self.readers = 0
+        self.started_at = time.time()
+        # Bumped when a retry starts over in a new spool file
+        self.generation = 0
+        self._extents = []
+        self._condition = threading.Condition()
+
+    # Writer side, called by the downloader
+
+    def start(self, path, total=None):
+        with self._condition:
+            self.path = path
+            self.total = total
+            self.available = 0
+            self.generation += 1
+            self._extents = []
+            self._condition.notify_all()
+
+    def written(self, offset, nbytes):
+        with self._condition:
+            if self.cancelled:
+                raise progress.Cancelled()
+
+            extents = []
+            for start, end in sorted(self._extents + [(offset, offset + nbytes)]):
+                if extents and start <= extents[-1][1]:
+                    extents[-1] = (extents[-1][0], max(extents[-1][1], end))
+                else:
+                    extents.append((start, end))
+            self._extents = extents
+
+            if extents[0][0] == 0 and extents[0][1] > self.available:
+                self.available = extents[0][1]
+                self._condition.notify_all()
+
+    def complete(self, path):
+        with self._condition:
+            # Resumable downloads are renamed into place; open files still work
+            self.path = path
+            self.available = self.total = os.path.getsize(path)
+            self.done = True
+            self._condition.notify_all()
+
+    def fail(self, error):
+        with self._condition:
+            self.error = error
+            self._condition.notify_all()
+
+    # Reader side
+
+    def join(self):
+        with self._condition:
+            if self.cancelled or self.error:
+                return False
+            if self.done and not os.path.exists(self.path):
+                return False
+            self.readers += 1
+            return True
+
+    def detach(self):
+        """Drop a reader; when the last one leaves an unfinished download stops"""
+        with self._condition:
+            self.readers -= 1
+            if self.readers > 0 or self.done or self.error:
+                return
+            self.cancelled = True
+        log.info("Last reader left, stopping download", extra={"key": self.key})
+
+    def wait_ready(self, timeout=None):
+        """Wait until bytes can be read or the download has ended"""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.path or self.done or self.error, timeout
+            )
+
+    def wait(self, on_progress=None):
+        """Block until the whole file is on disk and return its path"""
+        while True:
+            with self._condition:
+                if self.error:
+                    raise IOError(self.error)
+                if self.done:
+                    return self.path
+                self._condition.wait(WAIT_REPORT_INTERVAL)
+                available, total = self.available, self.total
+            if on_progress:
+                on_progress(bytes=available, total=total)
+
+    def iter_bytes(self):
+        """Yield the file from its first byte, following the download live"""
+        position = 0
+        f = None
+        opened = None
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(
+                        lambda: self.error or self.done or position < self.available
+                    )
+                    if self.error:
+                        raise IOError(self.error)
+                    if self.done and position >= self.available:
+                        return
+                    path, available = self.path, self.available
+                    generation, done = self.generation, self.done
+
+                if f is None or opened != generation:
+                    if f:
+                        f.close()
+                    try:
+                        f = open(path, "rb")
+                    except FileNotFoundError:
+                        f = None
+                        if done:
+                            raise IOError("Download is no longer on disk")
+                        # Renamed into place between our check and completion
+                        time.sleep(0.05)
+                        continue
+                    opened = generation
+
+                f.seek(position)
+                data = f.read(min(available - position, MAX_CHUNK_SIZE))
+                if not data:
+                    raise IOError(f"Spool file ended at byte {position}")
+                position += len(data)
+                yield data
+        finally:
+            if f:
+                f.close()
+
+
+def _produce(transfer, produce):
+    try:
+        path = produce(transfer)
+    except progress.Cancelled:
+        transfer.fail("Download cancelled")
+        return
+    except Exception as e:
+        transfer.fail(f"Download failed: {str(e)}")
+        return
+
+    if path:
+        transfer.complete(path)
+    else:
+        transfer.fail("Failed to download video")
+
+
+def attach(key, produce):
+    """Join the transfer running for key, or start produce(spool) for it.
+
+    produce runs on its own thread, downloads into the spool it is given
+    and returns the finished file's path (or None on failure). Finished
+    transfers stay shared for as long as their file is on disk. Every
+    caller owns one reader slot and must call detach() when done with it.
+    A key of None never shares.
+    """
+    with _lock:
+        for stale_key, stale in list(_transfers.items()):
+            if stale.error or stale.cancelled:
+                del _transfers[stale_key]
+            elif stale.done and not os.path.exists(stale.path):
+                del _transfers[stale_key]
+
+        transfer = _transfers.get(key) if key else None
+        if transfer and transfer.join():
+            _counts["joined"] += 1
+            return transfer
+
+        transfer = SharedTransfer(key)
+        transfer.join()
+        if key:
+            _transfers[key] = transfer
+        _counts["started"] += 1
+
+    # Upstream log lines carry the id of the request that started the download
+    context = contextvars.copy_context()
+    threading.Thread(
+        target=context.run, args=(_produce, transfer, produce), daemon=True
+    ).start()
+    return transfer
+
+
+def stats():
+    with _lock:
+        transfers = list(_transfers.values())
+        counts = dict(_counts)
+    return {
+        "in_flight": sum(1 for t in transfers if not t.done and not t.error),
+        "on_disk": sum(1 for t in transfers if t.done),
+        "readers": sum(t.readers for t in transfers),
+        "upstream_started": counts["started"],
+        "joined_existing": counts["joined"],
+    }
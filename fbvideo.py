@@ -1,20 +1,289 @@
-import requests
 import re
 import json
 import os
+import logging
 import time
-import random
 from urllib.parse import unquote, urlparse, parse_qs
-from bs4 import BeautifulSoup
 import html
 from datetime import datetime
-import tempfile
 import threading
 
+from downloader import download_to_temp
+from transport import new_session
+from deadline import Deadline
+import progress
+import metastore
+import negcache
+import urlexpiry
+import extraction
+import memtrack
+
+log = logging.getLogger(__name__)
+
+
+# Page scanners are plain functions so extraction.run() can ship them to a
+# worker process; they must not touch the network or any scraper state
+def decode_facebook_url(encoded_url):
+    try:
+        decoded = (
+            encoded_url.replace("\\/", "/").replace("\\u0026", "&").replace("\\", "")
+        )
+        decoded = html.unescape(decoded)
+        decoded = unquote(decoded)
+        return decoded
+    except:
+        return encoded_url
+
+
+AUDIO_REPRESENTATION = re.compile(r'\{[^{}]*"mime_type":"audio\\?/mp4"[^{}]*\}')
+DASH_MANIFEST = re.compile(r'"dash_manifest":"((?:[^"\\]|\\.)*)"')
+MANIFEST_ADAPTATION_SET = re.compile(
+    r"<AdaptationSet\b([^>]*)>(.*?)</AdaptationSet>", re.DOTALL
+)
+MANIFEST_REPRESENTATION = re.compile(
+    r"<Representation\b([^>]*)>(.*?)</Representation>", re.DOTALL
+)
+
+
+def scan_audio_urls(html_content):
+    """Audio-only DASH representations, highest bandwidth first.
+
+    Reels list them as JSON representations next to the video ones; older
+    players embed a full MPD in dash_manifest instead.
+    """
+    found = {}
+
+    for match in AUDIO_REPRESENTATION.finditer(html_content):
+        url = re.search(r'"base_url":"([^"]+)"', match.group(0))
+        bandwidth = re.search(r'"bandwidth":(\d+)', match.group(0))
+        if url:
+            decoded_url = decode_facebook_url(url.group(1))
+            if decoded_url.startswith("http"):
+                found[decoded_url] = int(bandwidth.group(1)) if bandwidth else 0
+
+    for match in DASH_MANIFEST.finditer(html_content):
+        try:
+            manifest = json.loads(f'"{match.group(1)}"')
+        except ValueError:
+            continue
+        for set_attributes, body in MANIFEST_ADAPTATION_SET.findall(manifest):
+            for attributes, representation in MANIFEST_REPRESENTATION.findall(body):
+                if "audio" not in set_attributes and "audio" not in attributes:
+                    continue
+                url = re.search(r"<BaseURL>([^<]+)</BaseURL>", representation)
+                bandwidth = re.search(r'bandwidth="(\d+)"', attributes)
+                if url:
+                    decoded_url = html.unescape(url.group(1).strip())
+                    if decoded_url.startswith("http"):
+                        found[decoded_url] = int(bandwidth.group(1)) if bandwidth else 0
+
+    return [
+        {"url": url, "bandwidth": bandwidth}
+        for url, bandwidth in sorted(found.items(), key=lambda x: x[1], reverse=True)
+    ]
+
+
+def scan_video_urls(html_content):
+    video_data = []
+
+    quality_patterns = {
+        "hd": [
+            r'"hd_src(?:_no_ratelimit)?":"([^"]+)"',
+            r'"playable_url_quality_hd":"([^"]+)"',
+            r'"browser_native_hd_url":"([^"]+)"',
+            r'hd_src:"([^"]+)"',
+            r'"video_hd_url":"([^"]+)"',
+            r'"hd_src_no_ratelimit":"([^"]+)"',
+            r'"HD"[^}]*"src":"([^"]+)"',
+            r'"quality":"hd"[^}]*"src":"([^"]+)"',
+        ],
+        "sd": [
+            r'"sd_src(?:_no_ratelimit)?":"([^"]+)"',
+            r'"playable_url_quality_sd":"([^"]+)"',
+            r'"browser_native_sd_url":"([^"]+)"',
+            r'sd_src:"([^"]+)"',
+            r'"video_sd_url":"([^"]+)"',
+            r'"sd_src_no_ratelimit":"([^"]+)"',
+            r'"SD"[^}]*"src":"([^"]+)"',
+            r'"quality":"sd"[^}]*"src":"([^"]+)"',
+        ],
+        "auto": [
+            r'"playable_url":"([^"]+)"',
+            r'"progressive_url":"([^"]+)"',
+            r'"src":"([^"]+mp4[^"]*)"',
+            r'"video_url":"([^"]+)"',
+            r'"videoUrl":"([^"]+)"',
+            r'"video_src":"([^"]+)"',
+            r'"reels_video_url":"([^"]+)"',
+            r'"video_dash_url":"([^"]+)"',
+            r'"video_progressive_url":"([^"]+)"',
+            r'"playback_url":"([^"]+)"',
+            r'"browser_native_(?:hd|sd)_url":"([^"]+)"',
+        ],
+    }
+
+    reel_specific_patterns = [
+        r'"videoData":\[\"([^"]+)\"\]',
+        r'"video_url":"([^"]+)".*?"reel"',
+        r'"attachments":\[.*?"media".*?"src":"([^"]+)"',
+        r'"story_bucket_owner":[^}]*"src":"([^"]+)"',
+        r'videoSrc["\']?\s*:\s*["\']([^"\']+)["\']',
+        r'"video":\s*{[^}]*"src":\s*"([^"]+)"',
+        r'"media":\s*{[^}]*"video_src":\s*"([^"]+)"',
+        r'"creation_story"[^}]*"attachments"[^}]*"media"[^}]*"browser_native_(?:hd|sd)_url":"([^"]+)"',
+        r'"video_versions":\[.*?"url":"([^"]+)"',
+        r'"dash_manifest":"([^"]+)"',
+        r'"video_dash_prefetch_representation"[^}]*"base_url":"([^"]+)"',
+    ]
+
+    for quality, patterns in quality_patterns.items():
+        for pattern in patterns:
+            matches = re.findall(pattern, html_content, re.IGNORECASE)
+            for match in matches:
+                decoded_url = decode_facebook_url(match)
+                if (
+                    decoded_url
+                    and (
+                        "video" in decoded_url.lower() or ".mp4" in decoded_url.lower()
+                    )
+                    and decoded_url.startswith("http")
+                ):
+                    video_data.append(
+                        {
+                            "url": decoded_url,
+                            "quality": quality,
+                            "source_pattern": pattern,
+                        }
+                    )
+
+    for pattern in reel_specific_patterns:
+        matches = re.findall(pattern, html_content, re.IGNORECASE)
+        for match in matches:
+            decoded_url = decode_facebook_url(match)
+            if (
+                decoded_url
+                and ("video" in decoded_url.lower() or ".mp4" in decoded_url.lower())
+                and decoded_url.startswith("http")
+            ):
+                video_data.append(
+                    {
+                        "url": decoded_url,
+                        "quality": "auto",
+                        "source_pattern": "reel_specific",
+                    }
+                )
+
+    for audio in scan_audio_urls(html_content):
+        video_data.append(
+            {
+                "url": audio["url"],
+                "quality": "audio",
+                "bandwidth": audio["bandwidth"],
+                "source_pattern": "dash_audio",
+            }
+        )
+
+    return video_data
+
+
+def scan_video_info(html_content):
+    info = {}
+
+    title_patterns = [
+        r'"title":"([^"]+)"',
+        r'"text":"([^"]+)".*?"creation_story"',
+        r'"message":\s*{\s*"text":"([^"]+)"',
+        r"<title[^>]*>([^<]*)</title>",
+        r'"name":"([^"]+)".*?"video"',
+        r'"attachments"[^}]*"title":"([^"]+)"',
+        r'"story_bucket_owner"[^}]*"name":"([^"]+)"',
+    ]
+
+    for pattern in title_patterns:
+        match = re.search(pattern, html_content, re.IGNORECASE)
+        if match and match.group(1).strip():
+            title = html.unescape(match.group(1)).strip()
+            if title and len(title) > 3 and not title.startswith("Facebook"):
+                info["title"] = title
+                break
+
+    author_patterns = [
+        r'"author":\s*{\s*"name":"([^"]+)"',
+        r'"owner":\s*{\s*"name":"([^"]+)"',
+        r'"name":"([^"]+)".*?"__typename":"User"',
+        r'"story_bucket_owner"[^}]*"name":"([^"]+)"',
+        r'"creation_story"[^}]*"short_form_video_context"[^}]*"playback_video"[^}]*"owner"[^}]*"name":"([^"]+)"',
+        r'"page_info"[^}]*"name":"([^"]+)"',
+    ]
+
+    for pattern in author_patterns:
+        match = re.search(pattern, html_content, re.IGNORECASE)
+        if match and match.group(1).strip():
+            author = html.unescape(match.group(1)).strip()
+            if author and len(author) > 1:
+                info["author"] = author
+                break
+
+    duration_patterns = [
+        r'"duration":(\d+)',
+        r'"length_in_milliseconds":(\d+)',
+        r'"playable_duration_in_ms":(\d+)',
+        r'"duration_ms":(\d+)',
+    ]
+
+    for pattern in duration_patterns:
+        match = re.search(pattern, html_content)
+        if match:
+            duration_ms = int(match.group(1))
+            if pattern.endswith(r'_ms"):(\d+)') or "milliseconds" in pattern:
+                duration_sec = duration_ms // 1000
+            else:
+                duration_sec = duration_ms
+
+            if duration_sec > 0:
+                minutes = duration_sec // 60
+                seconds = duration_sec % 60
+                info["duration"] = f"{minutes}:{seconds:02d}"
+                break
+
+    thumbnail_patterns = [
+        r'"preferred_thumbnail"[^}]*"image"[^}]*"uri":"([^"]+)"',
+        r'"thumbnail"[^}]*"image"[^}]*"uri":"([^"]+)"',
+        r'"thumbnailImage"[^}]*"uri":"([^"]+)"',
+        r'"image"[^}]*"uri":"([^"]+)"',
+        r'"cover_photo"[^}]*"source":"([^"]+)"',
+    ]
+
+    for pattern in thumbnail_patterns:
+        match = re.search(pattern, html_content, re.IGNORECASE)
+        if match:
+            thumbnail_url = decode_facebook_url(match.group(1))
+            if thumbnail_url and thumbnail_url.startswith("http"):
+                info["thumbnail"] = thumbnail_url
+                break
+
+    description_patterns = [
+        r'"description":"([^"]+)"',
+        r'"message":\s*{\s*"text":"([^"]+)"',
+        r'"creation_story"[^}]*"comet_sections"[^}]*"story"[^}]*"message"[^}]*"text":"([^"]+)"',
+    ]
+
+    for pattern in description_patterns:
+        match = re.search(pattern, html_content, re.IGNORECASE)
+        if match and match.group(1).strip():
+            description = html.unescape(match.group(1)).strip()
+            if description and len(description) > 3:
+                info["description"] = description[:200] + (
+                    "..." if len(description) > 200 else ""
+                )
+                break
+
+    return info
+
 
 class FacebookVideoDownloader:
     def __init__(self):
-        self.session = requests.Session()
+        self.session = new_session()
         self.setup_session()
 
     def setup_session(self):
@@ -34,7 +303,10 @@ class FacebookVideoDownloader:
         }
         self.session.headers.update(headers)
 
-    def normalize_url(self, url):
+    def report(self, stage, **data):
+        progress.emit(stage, platform="facebook", **data)
+
+    def normalize_url(self, url, deadline=None):
         if "facebook.com" not in url and "fb.watch" not in url:
             return None
 
@@ -45,7 +317,7 @@ class FacebookVideoDownloader:
             url = url.replace("m.facebook.com", "www.facebook.com")
 
         if "/share/r/" in url:
-            reel_id = self.extract_reel_id_from_share(url)
+            reel_id = self.extract_reel_id_from_share(url, deadline)
             if reel_id:
                 return f"https://www.facebook.com/reel/{reel_id}"
 
@@ -64,13 +336,23 @@ class FacebookVideoDownloader:
 
         return url
 
-    def extract_reel_id_from_share(self, url):
+    def extract_reel_id_from_share(self, url, deadline=None):
+        deadline = deadline or Deadline(None)
         try:
-            response = self.session.get(url, timeout=10, allow_redirects=True)
+            stored = metastore.get("short_link", url)
+            if stored:
+                return stored
+
+            response = self.session.get(
+                url, timeout=deadline.timeout(10), allow_redirects=True
+            )
             final_url = response.url
 
             reel_match = re.search(r"/reel/(\d+)", final_url)
             if reel_match:
+                metastore.put(
+                    "short_link", url, reel_match.group(1), metastore.SHORT_LINK_TTL
+                )
                 return reel_match.group(1)
 
             share_match = re.search(r"/share/r/([a-zA-Z0-9_-]+)", url)
@@ -100,117 +382,19 @@ class FacebookVideoDownloader:
 
         return None
 
-    def decode_facebook_url(self, encoded_url):
-        try:
-            decoded = (
-                encoded_url.replace("\\/", "/")
-                .replace("\\u0026", "&")
-                .replace("\\", "")
-            )
-            decoded = html.unescape(decoded)
-            decoded = unquote(decoded)
-            return decoded
-        except:
-            return encoded_url
-
     def extract_video_urls_with_quality(self, html_content):
-        video_data = []
-
-        quality_patterns = {
-            "hd": [
-                r'"hd_src(?:_no_ratelimit)?":"([^"]+)"',
-                r'"playable_url_quality_hd":"([^"]+)"',
-                r'"browser_native_hd_url":"([^"]+)"',
-                r'hd_src:"([^"]+)"',
-                r'"video_hd_url":"([^"]+)"',
-                r'"hd_src_no_ratelimit":"([^"]+)"',
-                r'"HD"[^}]*"src":"([^"]+)"',
-                r'"quality":"hd"[^}]*"src":"([^"]+)"',
-            ],
-            "sd": [
-                r'"sd_src(?:_no_ratelimit)?":"([^"]+)"',
-                r'"playable_url_quality_sd":"([^"]+)"',
-                r'"browser_native_sd_url":"([^"]+)"',
-                r'sd_src:"([^"]+)"',
-                r'"video_sd_url":"([^"]+)"',
-                r'"sd_src_no_ratelimit":"([^"]+)"',
-                r'"SD"[^}]*"src":"([^"]+)"',
-                r'"quality":"sd"[^}]*"src":"([^"]+)"',
-            ],
-            "auto": [
-                r'"playable_url":"([^"]+)"',
-                r'"progressive_url":"([^"]+)"',
-                r'"src":"([^"]+mp4[^"]*)"',
-                r'"video_url":"([^"]+)"',
-                r'"videoUrl":"([^"]+)"',
-                r'"video_src":"([^"]+)"',
-                r'"reels_video_url":"([^"]+)"',
-                r'"video_dash_url":"([^"]+)"',
-                r'"video_progressive_url":"([^"]+)"',
-                r'"playback_url":"([^"]+)"',
-                r'"browser_native_(?:hd|sd)_url":"([^"]+)"',
-            ],
-        }
-
-        reel_specific_patterns = [
-            r'"videoData":\[\"([^"]+)\"\]',
-            r'"video_url":"([^"]+)".*?"reel"',
-            r'"attachments":\[.*?"media".*?"src":"([^"]+)"',
-            r'"story_bucket_owner":[^}]*"src":"([^"]+)"',
-            r'videoSrc["\']?\s*:\s*["\']([^"\']+)["\']',
-            r'"video":\s*{[^}]*"src":\s*"([^"]+)"',
-            r'"media":\s*{[^}]*"video_src":\s*"([^"]+)"',
-            r'"creation_story"[^}]*"attachments"[^}]*"media"[^}]*"browser_native_(?:hd|sd)_url":"([^"]+)"',
-            r'"video_versions":\[.*?"url":"([^"]+)"',
-            r'"dash_manifest":"([^"]+)"',
-            r'"video_dash_prefetch_representation"[^}]*"base_url":"([^"]+)"',
-        ]
-
-        for quality, patterns in quality_patterns.items():
-            for pattern in patterns:
-                matches = re.findall(pattern, html_content, re.IGNORECASE)
-                for match in matches:
-                    decoded_url = self.decode_facebook_url(match)
-                    if (
-                        decoded_url
-                        and (
-                            "video" in decoded_url.lower()
-                            or ".mp4" in decoded_url.lower()
-                        )
-                        and decoded_url.startswith("http")
-                    ):
-                        video_data.append(
-                            {
-                                "url": decoded_url,
-                                "quality": quality,
-                                "source_pattern": pattern,
-                            }
-                        )
+        return extraction.run(scan_video_urls, html_content)
 
-        for pattern in reel_specific_patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            for match in matches:
-                decoded_url = self.decode_facebook_url(match)
-                if (
-                    decoded_url
-                    and (
-                        "video" in decoded_url.lower() or ".mp4" in decoded_url.lower()
-                    )
-                    and decoded_url.startswith("http")
-                ):
-                    video_data.append(
-                        {
-                            "url": decoded_url,
-                            "quality": "auto",
-                            "source_pattern": "reel_specific",
-                        }
-                    )
-
-        return video_data
-
-    def get_video_quality_info(self, url):
+    def get_video_quality_info(self, url, deadline=None):
+        deadline = deadline or Deadline(None)
         try:
-            response = self.session.head(url, timeout=10, allow_redirects=True)
+            stored = metastore.get("facebook_probe", url)
+            if stored:
+                return stored
+
+            response = self.session.head(
+                url, timeout=deadline.timeout(10), allow_redirects=True
+            )
             content_type = response.headers.get("content-type", "").lower()
             content_length = response.headers.get("content-length", "0")
 
@@ -235,21 +419,35 @@ class FacebookVideoDownloader:
                     detected_quality = quality
                     break
 
-            return {
+            quality_info = {
                 "working": True,
                 "size_bytes": int(content_length) if content_length.isdigit() else 0,
                 "size_mb": size_mb,
                 "content_type": content_type,
                 "detected_quality": detected_quality,
             }
+            metastore.put(
+                "facebook_probe",
+                url,
+                quality_info,
+                urlexpiry.ttl_for(url, metastore.PROBE_TTL),
+            )
+            return quality_info
         except:
             return None
 
-    def extract_video_urls(self, facebook_url):
+    def extract_video_urls(self, facebook_url, deadline=None):
+        """Candidate URLs, and whether any page fetch actually got a 200.
+
+        No URLs from pages that loaded means the video is gone; no URLs
+        because every fetch failed says nothing about the video.
+        """
+        deadline = deadline or Deadline(None)
+        pages_loaded = False
         try:
-            normalized_url = self.normalize_url(facebook_url)
+            normalized_url = self.normalize_url(facebook_url, deadline)
             if not normalized_url:
-                return []
+                return [], pages_loaded
 
             all_video_data = []
             is_reel = "/reel/" in normalized_url
@@ -272,15 +470,23 @@ class FacebookVideoDownloader:
                 )
                 urls_to_check.append(mobile_url)
 
-            for url in urls_to_check:
+            for index, url in enumerate(urls_to_check, 1):
+                if not deadline.allows():
+                    log.info("Request budget spent, skipping remaining page fetches")
+                    break
+                self.report("page_fetch", index=index, total=len(urls_to_check))
                 try:
-                    response = self.session.get(url, timeout=15, allow_redirects=True)
-
-                    if response.status_code == 200:
-                        video_data = self.extract_video_urls_with_quality(response.text)
-                        all_video_data.extend(video_data)
+                    with memtrack.stage("facebook", "page_scan"):
+                        response = self.session.get(
+                            url, timeout=deadline.timeout(15), allow_redirects=True
+                        )
 
-                    time.sleep(random.uniform(1, 2))
+                        if response.status_code == 200:
+                            pages_loaded = True
+                            video_data = self.extract_video_urls_with_quality(
+                                response.text
+                            )
+                            all_video_data.extend(video_data)
                 except Exception as e:
                     continue
 
@@ -296,22 +502,34 @@ class FacebookVideoDownloader:
                     current_quality = unique_videos[clean_url]["quality"]
                     new_quality = video["quality"]
 
-                    quality_priority = {"hd": 3, "sd": 2, "auto": 1}
+                    # A URL seen as an audio representation must not be
+                    # offered as a video just because a looser pattern matched
+                    quality_priority = {"audio": 4, "hd": 3, "sd": 2, "auto": 1}
                     if quality_priority.get(new_quality, 0) > quality_priority.get(
                         current_quality, 0
                     ):
                         unique_videos[clean_url] = video
 
-            return list(unique_videos.values())
+            return list(unique_videos.values()), pages_loaded
 
         except Exception as e:
-            return []
+            return [], pages_loaded
 
-    def analyze_video_qualities(self, video_data_list):
+    def analyze_video_qualities(self, video_data_list, deadline=None):
+        deadline = deadline or Deadline(None)
         quality_options = []
 
-        for video_data in video_data_list:
-            quality_info = self.get_video_quality_info(video_data["url"])
+        for index, video_data in enumerate(video_data_list, 1):
+            if not deadline.allows():
+                log.info("Request budget spent, skipping remaining quality probes")
+                break
+            self.report(
+                "probe",
+                index=index,
+                total=len(video_data_list),
+                quality=video_data["quality"],
+            )
+            quality_info = self.get_video_quality_info(video_data["url"], deadline)
 
             if quality_info and quality_info["working"]:
                 quality_label = video_data["quality"].upper()
@@ -333,6 +551,24 @@ class FacebookVideoDownloader:
         quality_options.sort(key=lambda x: x["size_bytes"], reverse=True)
         return quality_options
 
+    def unverified_quality_options(self, video_data_list):
+        quality_priority = {"hd": 3, "sd": 2, "auto": 1}
+        candidates = sorted(
+            video_data_list,
+            key=lambda x: quality_priority.get(x["quality"], 0),
+            reverse=True,
+        )
+        return [
+            {
+                "url": video_data["url"],
+                "quality": video_data["quality"].upper(),
+                "size_mb": 0,
+                "size_bytes": 0,
+                "resolution_estimate": "unknown",
+            }
+            for video_data in candidates
+        ]
+
     def estimate_resolution(self, size_mb):
         if size_mb > 50:
             return "1080p (estimated)"
@@ -344,111 +580,21 @@ class FacebookVideoDownloader:
             return "360p or lower (estimated)"
 
     def extract_enhanced_video_info(self, html_content):
-        info = {}
-
-        title_patterns = [
-            r'"title":"([^"]+)"',
-            r'"text":"([^"]+)".*?"creation_story"',
-            r'"message":\s*{\s*"text":"([^"]+)"',
-            r"<title[^>]*>([^<]*)</title>",
-            r'"name":"([^"]+)".*?"video"',
-            r'"attachments"[^}]*"title":"([^"]+)"',
-            r'"story_bucket_owner"[^}]*"name":"([^"]+)"',
-        ]
-
-        for pattern in title_patterns:
-            match = re.search(pattern, html_content, re.IGNORECASE)
-            if match and match.group(1).strip():
-                title = html.unescape(match.group(1)).strip()
-                if title and len(title) > 3 and not title.startswith("Facebook"):
-                    info["title"] = title
-                    break
-
-        author_patterns = [
-            r'"author":\s*{\s*"name":"([^"]+)"',
-            r'"owner":\s*{\s*"name":"([^"]+)"',
-            r'"name":"([^"]+)".*?"__typename":"User"',
-            r'"story_bucket_owner"[^}]*"name":"([^"]+)"',
-            r'"creation_story"[^}]*"short_form_video_context"[^}]*"playback_video"[^}]*"owner"[^}]*"name":"([^"]+)"',
-            r'"page_info"[^}]*"name":"([^"]+)"',
-        ]
-
-        for pattern in author_patterns:
-            match = re.search(pattern, html_content, re.IGNORECASE)
-            if match and match.group(1).strip():
-                author = html.unescape(match.group(1)).strip()
-                if author and len(author) > 1:
-                    info["author"] = author
-                    break
-
-        duration_patterns = [
-            r'"duration":(\d+)',
-            r'"length_in_milliseconds":(\d+)',
-            r'"playable_duration_in_ms":(\d+)',
-            r'"duration_ms":(\d+)',
-        ]
-
-        for pattern in duration_patterns:
-            match = re.search(pattern, html_content)
-            if match:
-                duration_ms = int(match.group(1))
-                if pattern.endswith(r'_ms"):(\d+)') or "milliseconds" in pattern:
-                    duration_sec = duration_ms // 1000
-                else:
-                    duration_sec = duration_ms
-
-                if duration_sec > 0:
-                    minutes = duration_sec // 60
-                    seconds = duration_sec % 60
-                    info["duration"] = f"{minutes}:{seconds:02d}"
-                    break
-
-        thumbnail_patterns = [
-            r'"preferred_thumbnail"[^}]*"image"[^}]*"uri":"([^"]+)"',
-            r'"thumbnail"[^}]*"image"[^}]*"uri":"([^"]+)"',
-            r'"thumbnailImage"[^}]*"uri":"([^"]+)"',
-            r'"image"[^}]*"uri":"([^"]+)"',
-            r'"cover_photo"[^}]*"source":"([^"]+)"',
-        ]
-
-        for pattern in thumbnail_patterns:
-            match = re.search(pattern, html_content, re.IGNORECASE)
-            if match:
-                thumbnail_url = self.decode_facebook_url(match.group(1))
-                if thumbnail_url and thumbnail_url.startswith("http"):
-                    info["thumbnail"] = thumbnail_url
-                    break
-
-        description_patterns = [
-            r'"description":"([^"]+)"',
-            r'"message":\s*{\s*"text":"([^"]+)"',
-            r'"creation_story"[^}]*"comet_sections"[^}]*"story"[^}]*"message"[^}]*"text":"([^"]+)"',
-        ]
-
-        for pattern in description_patterns:
-            match = re.search(pattern, html_content, re.IGNORECASE)
-            if match and match.group(1).strip():
-                description = html.unescape(match.group(1)).strip()
-                if description and len(description) > 3:
-                    info["description"] = description[:200] + (
-                        "..." if len(description) > 200 else ""
-                    )
-                    break
-
-        return info
+        return extraction.run(scan_video_info, html_content)
 
-    def get_video_info(self, facebook_url):
+    def get_video_info(self, facebook_url, deadline=None):
+        deadline = deadline or Deadline(None)
         try:
-            normalized_url = self.normalize_url(facebook_url)
+            normalized_url = self.normalize_url(facebook_url, deadline)
             if not normalized_url:
                 return None
 
-            response = self.session.get(normalized_url, timeout=15)
+            response = self.session.get(normalized_url, timeout=deadline.timeout(15))
             if response.status_code != 200:
                 mobile_url = normalized_url.replace(
                     "www.facebook.com", "m.facebook.com"
                 )
-                response = self.session.get(mobile_url, timeout=15)
+                response = self.session.get(mobile_url, timeout=deadline.timeout(15))
 
             if response.status_code != 200:
                 return None
@@ -458,77 +604,145 @@ class FacebookVideoDownloader:
         except Exception as e:
             return None
 
-    def get_video_data(self, url):
+    def get_video_data(self, url, deadline=None):
+        deadline = deadline or Deadline(None)
         try:
-            normalized_url = self.normalize_url(url)
+            self.report("normalizing", url=url)
+            failure = negcache.lookup("facebook", url)
+            if failure:
+                return failure
+
+            normalized_url = self.normalize_url(url, deadline)
             if not normalized_url:
-                return {"error": "Invalid Facebook URL"}
+                error = {"error": "Invalid Facebook URL"}
+                negcache.remember("facebook", url, error)
+                return error
 
             video_id = self.extract_video_id(normalized_url)
             if not video_id:
-                return {"error": "Could not extract video ID"}
-
-            video_data_list = self.extract_video_urls(normalized_url)
-            if not video_data_list:
-                return {"error": "No video URLs found"}
-
-            quality_options = self.analyze_video_qualities(video_data_list)
-            if not quality_options:
-                return {"error": "No working video URLs found"}
-
-            best_quality = quality_options[0]
-            info = self.get_video_info(normalized_url) or {}
-
-            hd_url = None
-            sd_url = None
-            auto_url = best_quality["url"]
-
-            for option in quality_options:
-                if option["quality"] == "HD" and not hd_url:
-                    hd_url = option["url"]
-                elif option["quality"] == "SD" and not sd_url:
-                    sd_url = option["url"]
-
-            return {
-                "video_url_hd": hd_url,
-                "video_url_sd": sd_url,
-                "video_url_auto": auto_url,
-                "title": info.get("title", "Facebook Video"),
-                "author": info.get("author", "Unknown"),
-                "duration": info.get("duration", "0:00"),
-                "thumbnail": info.get("thumbnail", ""),
-                "video_id": video_id,
-                "quality_options": quality_options,
-                "width": 0,
-                "height": 0,
-            }
+                error = {"error": "Could not extract video ID"}
+                negcache.remember("facebook", url, error)
+                return error
+            self.report("video_id", video_id=video_id)
+
+            stored = metastore.get(
+                "facebook_video",
+                video_id,
+                refresh=lambda: self.resolve_video(
+                    video_id, normalized_url, Deadline(metastore.REFRESH_DEADLINE)
+                ),
+            )
+            if stored:
+                log.debug(
+                    "Using stored Facebook video data", extra={"video_id": video_id}
+                )
+                return stored
+
+            failure = negcache.lookup("facebook", video_id)
+            if failure:
+                return failure
+
+            result = self.resolve_video(video_id, normalized_url, deadline)
+            if "error" in result:
+                # Running out of time proves nothing about the video itself
+                error_class = None if deadline.allows() else "upstream"
+                negcache.remember("facebook", video_id, result, error_class)
+            return result
 
         except Exception as e:
             return {"error": f"Failed to get video data: {str(e)}"}
 
-    def download_video_file(self, video_url, filename):
+    def resolve_video(self, video_id, normalized_url, deadline):
+        video_data_list, pages_loaded = self.extract_video_urls(
+            normalized_url, deadline
+        )
+        audio_options = sorted(
+            (v for v in video_data_list if v["quality"] == "audio"),
+            key=lambda x: x.get("bandwidth", 0),
+            reverse=True,
+        )
+        video_data_list = [v for v in video_data_list if v["quality"] != "audio"]
+        if not video_data_list:
+            if not pages_loaded:
+                return {"error": "Could not load the Facebook video page"}
+            return {"error": "No video URLs found"}
+
+        quality_options = self.analyze_video_qualities(video_data_list, deadline)
+        if not quality_options and not deadline.allows():
+            # Out of time before any probe answered: unverified beats nothing
+            self.report("fallback", method="unverified_urls")
+            quality_options = self.unverified_quality_options(video_data_list)
+        if not quality_options:
+            # Options only come from probes that got a 200, so every probe
+            # failed; that is an upstream problem, not a missing video
+            return {"error": "Could not reach any Facebook video URL"}
+
+        best_quality = quality_options[0]
+        info = {}
+        if deadline.allows():
+            self.report("metadata")
+            with memtrack.stage("facebook", "info_page"):
+                info = self.get_video_info(normalized_url, deadline) or {}
+
+        hd_url = None
+        sd_url = None
+        auto_url = best_quality["url"]
+
+        for option in quality_options:
+            if option["quality"] == "HD" and not hd_url:
+                hd_url = option["url"]
+            elif option["quality"] == "SD" and not sd_url:
+                sd_url = option["url"]
+
+        result = {
+            "video_url_hd": hd_url,
+            "video_url_sd": sd_url,
+            "video_url_auto": auto_url,
+            "audio_url": audio_options[0]["url"] if audio_options else None,
+            "title": info.get("title", "Facebook Video"),
+            "author": info.get("author", "Unknown"),
+            "duration": info.get("duration", "0:00"),
+            "thumbnail": info.get("thumbnail", ""),
+            "video_id": video_id,
+            "quality_options": quality_options,
+            "width": 0,
+            "height": 0,
+        }
+        if not deadline.allows():
+            result["partial"] = True
+        else:
+            # Kept until shortly before the first signed CDN URL in it expires
+            ttl = urlexpiry.ttl_for(result, metastore.VIDEO_TTL)
+            metastore.put("facebook_video", video_id, result, ttl)
+        return result
+
+    def download_video_file(
+        self, video_url, filename, video_id=None, quality=None, spool=None
+    ):
         try:
-            response = self.session.get(video_url, stream=True, timeout=60)
-            response.raise_for_status()
-
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    temp_file.write(chunk)
-
-            temp_file.close()
+            resume_key = None
+            if video_id:
+                resume_key = f"facebook_{video_id}_{quality or 'auto'}"
+
+            temp_path = download_to_temp(
+                self.session,
+                video_url,
+                timeout=60,
+                resume_key=resume_key,
+                on_progress=progress.bound("download", platform="facebook"),
+                spool=spool,
+            )
 
             def remove_file():
                 time.sleep(300)
                 try:
-                    os.unlink(temp_file.name)
+                    os.unlink(temp_path)
                 except:
                     pass
 
             threading.Thread(target=remove_file, daemon=True).start()
 
-            return temp_file.name
+            return temp_path
 
         except Exception as e:
             return None
@@ -0,0 +1,192 @@
+import os
+import logging
+import time
+import uuid
+import queue
+import itertools
+import threading
+
+import logs
+import progress
+
+log = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "100"))
+# Downloaded files are removed after 5 minutes, so results cannot outlive that
+JOB_RESULT_TTL = 300
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, key, params, priority):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.params = params
+        self.priority = priority
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.error_status = None
+        self.reporter = progress.ProgressReporter()
+        self.watchers = 0
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "done":
+            data["filename"] = self.result.get("filename")
+            data["expires_at"] = self.finished_at + JOB_RESULT_TTL
+        elif self.status == "failed":
+            data["error"] = self.error
+        elif self.status == "running":
+            data["progress"] = self.reporter.latest()
+        return data
+
+
+class JobQueue:
+    """Bounded priority queue of background jobs run by a fixed worker pool.
+
+    Submitting a job identical to one that is queued, running or finished
+    but not yet expired returns the existing job instead of a new one.
+    Workers start on the first submission so idle processes pay nothing.
+    """
+
+    def __init__(
+        self,
+        runner,
+        workers=JOB_WORKERS,
+        max_queued=JOB_QUEUE_SIZE,
+        result_ttl=JOB_RESULT_TTL,
+    ):
+        self.runner = runner
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.jobs = {}
+        self.jobs_by_key = {}
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._started = False
+        self.deduplicated = 0
+        self.rejected = 0
+
+    def _start_workers(self):
+        if self._started:
+            return
+        self._started = True
+        for _ in range(self.workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def _expire(self):
+        now = time.time()
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at and now - job.finished_at > self.result_ttl:
+                del self.jobs[job_id]
+                if self.jobs_by_key.get(job.key) is job:
+                    del self.jobs_by_key[job.key]
+
+    def submit(self, key, params, priority="normal"):
+        with self._lock:
+            self._expire()
+
+            existing = self.jobs_by_key.get(key)
+            if existing and existing.status not in ("failed", "cancelled"):
+                self.deduplicated += 1
+                return existing
+
+            queued = sum(1 for job in self.jobs.values() if job.status == "queued")
+            if queued >= self.max_queued:
+                self.rejected += 1
+                raise QueueFull(f"Job queue is full ({queued} waiting)")
+
+            job = Job(key, params, priority)
+            self.jobs[job.id] = job
+            self.jobs_by_key[key] = job
+            self._queue.put((PRIORITIES.get(priority, 1), next(self._sequence), job))
+            self._start_workers()
+            return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._expire()
+            return self.jobs.get(job_id)
+
+    def watch(self, job):
+        with self._lock:
+            job.watchers += 1
+
+    def unwatch(self, job):
+        """Drop an event stream; a job nobody watches any more is cancelled"""
+        with self._lock:
+            job.watchers -= 1
+            if job.watchers > 0 or job.status not in ("queued", "running"):
+                return
+        log.info("Last listener left, cancelling job", extra={"job_id": job.id})
+        job.reporter.cancel()
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            # Log lines from the job carry its id in place of a request id
+            _, log_token = logs.begin_request(job.id)
+            try:
+                with progress.reporting(job.reporter):
+                    job.reporter.emit("started")
+                    result = self.runner(**job.params)
+            except progress.Cancelled:
+                result = None
+            except Exception as e:
+                log.exception("Job failed")
+                result = {"error": f"Job failed: {str(e)}", "status": 500}
+            finally:
+                logs.end_request(log_token)
+
+            job.finished_at = time.time()
+            if result is None:
+                job.status = "cancelled"
+                job.reporter.finish("cancelled")
+            elif "error" in result:
+                job.error = result["error"]
+                job.error_status = result.get("status", 500)
+                job.status = "failed"
+                job.reporter.finish("failed", error=job.error)
+            else:
+                job.result = result
+                job.status = "done"
+                job.reporter.finish("done", filename=result.get("filename"))
+
+    def stats(self):
+        with self._lock:
+            counts = {
+                "queued": 0,
+                "running": 0,
+                "done": 0,
+                "failed": 0,
+                "cancelled": 0,
+            }
+            for job in self.jobs.values():
+                counts[job.status] += 1
+            return {
+                "workers": self.workers,
+                "max_queued": self.max_queued,
+                "jobs": counts,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,168 @@
+import os
+import sys
+import copy
+import json
+import time
+import uuid
+import queue
+import atexit
+import random
+import logging
+import threading
+import contextvars
+import logging.handlers
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "json" for the log shipper, "text" for reading on a terminal
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+# level = share of records kept, e.g. "DEBUG=0.01,INFO=0.5"
+LOG_SAMPLE = os.environ.get("LOG_SAMPLE", "")
+# Records waiting for the writer thread; beyond this they are dropped
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_request = contextvars.ContextVar("request", default=None)
+_lock = threading.Lock()
+_listener = None
+_counts = {"dropped": 0, "sampled_out": 0}
+
+
+def parse_sample_rates(value):
+    rates = {}
+    for item in value.split(","):
+        level, _, rate = item.strip().partition("=")
+        number = logging.getLevelName(level.upper())
+        try:
+            if isinstance(number, int):
+                rates[number] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+def begin_request(request_id=None):
+    """Tag records from this context with a request id and elapsed time"""
+    request_id = request_id or uuid.uuid4().hex[:16]
+    return request_id, _request.set((request_id, time.monotonic()))
+
+
+def end_request(token):
+    _request.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Stamp the request context and apply per-level sampling.
+
+    Runs on the thread that logs, so it only reads context variables. A
+    request's sampling decision is made once per level, so a sampled
+    request keeps all of its lines at that level rather than a random few.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        current = _request.get()
+        if current:
+            record.request_id = current[0]
+            record.elapsed_ms = round((time.monotonic() - current[1]) * 1000, 1)
+
+        rate = self.rates.get(record.levelno, 1.0)
+        if rate < 1.0:
+            seed = f"{current[0]}:{record.levelno}" if current else None
+            roll = random.Random(seed).random() if seed else random.random()
+            if roll >= rate:
+                with _lock:
+                    _counts["sampled_out"] += 1
+                return False
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record"""
+
+    def prepare(self, record):
+        # Only merge the message here; JSON encoding happens on the writer thread
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with _lock:
+                _counts["dropped"] += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.message,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        extra = " ".join(
+            f"{key}={value}"
+            for key, value in vars(record).items()
+            if key not in _RECORD_FIELDS
+        )
+        line = f"{record.levelname:<7} {record.name}: {record.message}"
+        if extra:
+            line += f" [{extra}]"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def setup():
+    """Route all logging through a queue to a single writer thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(
+            TextFormatter() if LOG_FORMAT == "text" else JsonFormatter()
+        )
+
+        handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        handler.addFilter(ContextFilter(parse_sample_rates(LOG_SAMPLE)))
+
+        root = logging.getLogger()
+        root.handlers[:] = [handler]
+        root.setLevel(LOG_LEVEL)
+
+        _listener = logging.handlers.QueueListener(handler.queue, stream)
+        _listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_listener.stop)
+
+
+def stats():
+    with _lock:
+        data = dict(_counts)
+    data["queued"] = _listener.queue.qsize() if _listener else 0
+    data["level"] = LOG_LEVEL
+    data["format"] = LOG_FORMAT
+    return data
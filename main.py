@@ -1,23 +1,112 @@
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import (
+    Flask,
+    Response,
+    request,
+    jsonify,
+    send_file,
+    send_from_directory,
+    render_template,
+    url_for,
+    stream_with_context,
+    g,
+)
 from flask_cors import CORS
 import os
+import json
+import math
+import functools
 import time
+import hmac
+import hashlib
+import importlib
+import mimetypes
 import threading
+import contextvars
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from urllib.parse import urlparse
 import logging
 
+# Scrapers, transport and rate limiting pull in requests; they are imported
+# on first use so cold starts that only serve /health or pages skip them
 try:
-    from tiktokscrape import TikTokScraper
-    from fbvideo import FacebookVideoDownloader
+    from transfer import iter_response, read_chunks
+    from deadline import Deadline
+    from jobs import JobQueue, QueueFull, PRIORITIES
+    import progress
+    from progress import ProgressReporter, sse_stream
+    import fanout
+    import metastore
+    import urlexpiry
+    import compression
+    import negcache
+    import logs
+    import memtrack
+    import admission
+    from admission import Overloaded
+    import profiler
+    import thumbs
+    import bundle
 except ImportError as e:
     print(f"Import error: {e}")
     raise
 
+logs.setup()
+log = logging.getLogger(__name__)
+
 app = Flask(__name__)
 CORS(app)
 
+# Downloads are served from files on disk; behind a front server that supports
+# X-Sendfile the kernel copies them to the client instead of Python
+app.config["USE_X_SENDFILE"] = os.environ.get("USE_X_SENDFILE") == "1"
+# Set when a front proxy assigns X-Request-ID and strips the client's copy;
+# otherwise the header is the client's own and every request gets a fresh id
+TRUSTED_PROXY = os.environ.get("TRUSTED_PROXY") == "1"
+
 logging.getLogger("werkzeug").setLevel(logging.WARNING)
 
+# Output of build_assets.py; without it templates fall back to plain /static/
+ASSET_DIR = os.path.join(app.static_folder, "dist")
+# Fingerprinted names change with their content, so they can be cached forever
+ASSET_MAX_AGE = 365 * 24 * 3600
+# Preferred first
+ASSET_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def load_asset_manifest():
+    try:
+        with open(os.path.join(ASSET_DIR, "manifest.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+asset_manifest = load_asset_manifest()
+asset_names = set(asset_manifest.values())
+
+# Total time allowed for resolving one video, kept below the load balancer timeout
+REQUEST_DEADLINE = float(os.environ.get("REQUEST_DEADLINE", "25"))
+# Background jobs have no load balancer waiting on them
+JOB_DEADLINE = float(os.environ.get("JOB_DEADLINE", "60"))
+# Shared caches may keep a lookup this long when it holds no signed URL
+VIDEO_INFO_MAX_AGE = int(os.environ.get("VIDEO_INFO_MAX_AGE", "300"))
+# How long a download response waits for the first upstream bytes
+DOWNLOAD_START_TIMEOUT = float(os.environ.get("DOWNLOAD_START_TIMEOUT", "60"))
+# Seconds a client shed for memory pressure is asked to wait
+MEMORY_RETRY_AFTER = 5
+# Videos a single bundle request may ask for
+BUNDLE_MAX_ITEMS = int(os.environ.get("BUNDLE_MAX_ITEMS", "50"))
+# A bundle resolves this many videos at once; bodies stream one after another
+BUNDLE_RESOLVE_WORKERS = int(os.environ.get("BUNDLE_RESOLVE_WORKERS", "4"))
+# Used for bundle items that do not name a quality
+BUNDLE_DEFAULT_QUALITY = {"tiktok": "no_watermark", "facebook": "hd"}
+# Added to the scraper session's own headers when fetching bundle bodies
+BUNDLE_STREAM_HEADERS = {"tiktok": {"Referer": "https://www.tiktok.com/"}}
+# Soundtracks keep the container their URL names; anything else is DASH MP4
+AUDIO_TYPES = {".mp3": "audio/mpeg", ".m4a": "audio/mp4", ".aac": "audio/aac"}
+
 
 def detect_platform(url):
     """Detect the platform based on URL"""
@@ -36,21 +125,153 @@ def cleanup_temp_file(file_path, delay=300):
         time.sleep(delay)
         try:
             os.unlink(file_path)
-            print(f"Cleaned up temporary file: {file_path}")
+            log.debug("Cleaned up temporary file", extra={"path": file_path})
         except:
             pass
 
     threading.Thread(target=remove_file, daemon=True).start()
 
 
-try:
-    tiktok_scraper = TikTokScraper()
-    facebook_scraper = FacebookVideoDownloader()
-    print("✅ Scrapers initialized successfully")
-except Exception as e:
-    print(f"❌ Error initializing scrapers: {e}")
-    tiktok_scraper = None
-    facebook_scraper = None
+SCRAPER_CLASSES = {
+    "tiktok": ("tiktokscrape", "TikTokScraper"),
+    "facebook": ("fbvideo", "FacebookVideoDownloader"),
+}
+scrapers = {}
+scrapers_lock = threading.Lock()
+proxy_session = None
+
+
+def get_scraper(platform):
+    """Import and build a platform's scraper on first use; None if that failed"""
+    with scrapers_lock:
+        if platform not in scrapers:
+            module_name, class_name = SCRAPER_CLASSES[platform]
+            try:
+                module = importlib.import_module(module_name)
+                scrapers[platform] = getattr(module, class_name)()
+                log.info("Scraper initialized", extra={"scraper": class_name})
+            except Exception as e:
+                log.error(
+                    "Scraper failed to initialize",
+                    extra={"scraper": class_name, "error": str(e)},
+                )
+                scrapers[platform] = None
+        return scrapers[platform]
+
+
+def get_proxy_session():
+    """Preview proxying fetches arbitrary CDN URLs, so it gets its own session"""
+    global proxy_session
+    with scrapers_lock:
+        if proxy_session is None:
+            from transport import new_session
+
+            proxy_session = new_session()
+        return proxy_session
+
+
+@app.before_request
+def begin_request_log():
+    # Reuse the id a front proxy assigned, so both logs line up
+    incoming = None
+    if TRUSTED_PROXY:
+        incoming = request.headers.get("X-Request-ID", "")[:64] or None
+    g.request_id, g.log_token = logs.begin_request(incoming)
+
+
+@app.before_request
+def begin_request_profile():
+    # Only admins can ask for this; other requests pay one header lookup
+    if request.headers.get("X-Profile") and is_admin():
+        g.profile = profiler.start_request()
+
+
+@app.teardown_request
+def end_request_profile(error=None):
+    if "profile" in g:
+        profiler.finish_request(g.request_id, g.pop("profile"))
+
+
+def is_admin():
+    """True when the request carries the configured admin token"""
+    if not profiler.PROFILE_TOKEN:
+        return False
+    # compare_digest only takes ASCII str, so compare the encoded bytes
+    supplied = request.headers.get("Authorization", "").encode()
+    expected = f"Bearer {profiler.PROFILE_TOKEN}".encode()
+    return hmac.compare_digest(supplied, expected)
+
+
+@app.after_request
+def log_request(response):
+    response.headers["X-Request-ID"] = g.request_id
+    # Page, asset and health check hits would drown out the API lines
+    level = logging.INFO if request.path.startswith("/api/") else logging.DEBUG
+    log.log(
+        level,
+        "Request served",
+        extra={
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+        },
+    )
+    # werkzeug hands direct_passthrough bodies (send_file) to the server as
+    # they are and never runs their close callbacks; teardown resets those
+    if response.is_streamed and not response.direct_passthrough and "log_token" in g:
+        # The body is generated after teardown; keep its lines tagged until
+        # the server closes the response
+        response.call_on_close(functools.partial(logs.end_request, g.pop("log_token")))
+    return response
+
+
+@app.teardown_request
+def end_request_log(error=None):
+    # Streamed responses can run teardown twice; the token resets only once
+    if "log_token" in g:
+        logs.end_request(g.pop("log_token"))
+
+
+@app.after_request
+def compress_json(response):
+    return compression.compress_response(response, request.accept_encodings)
+
+
+@app.context_processor
+def asset_helpers():
+    def asset_url(filename):
+        hashed = asset_manifest.get(filename)
+        if hashed:
+            return url_for("asset", filename=hashed)
+        return url_for("static", filename=filename)
+
+    return {"asset_url": asset_url}
+
+
+@app.route("/assets/<filename>")
+def asset(filename):
+    """Fingerprinted static file, precompressed when the client accepts it"""
+    if filename not in asset_names:
+        return jsonify({"error": "Endpoint not found"}), 404
+
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, suffix in ASSET_ENCODINGS:
+        if request.accept_encodings[encoding] and os.path.exists(
+            os.path.join(ASSET_DIR, filename + suffix)
+        ):
+            response = send_from_directory(
+                ASSET_DIR, filename + suffix, mimetype=mimetype, max_age=ASSET_MAX_AGE
+            )
+            response.headers["Content-Encoding"] = encoding
+            break
+    else:
+        response = send_from_directory(
+            ASSET_DIR, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE
+        )
+
+    response.vary.add("Accept-Encoding")
+    response.cache_control.immutable = True
+    return response
 
 
 @app.route("/")
@@ -62,56 +283,171 @@ def index():
 @app.route("/api/video-info", methods=["POST"])
 def get_video_info():
     """Get video information from TikTok or Facebook URL"""
+    deadline = Deadline(REQUEST_DEADLINE)
     try:
         data = request.get_json()
         if not data:
             return jsonify({"error": "No data provided"}), 400
 
-        url = data.get("url", "").strip()
+        payload, status = resolve_video_info(data.get("url", "").strip(), deadline)
+        return jsonify(payload), status
 
-        if not url:
-            return jsonify({"error": "URL is required"}), 400
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        error_msg = f"Internal server error: {str(e)}"
+        log.exception("Video info request failed")
+        return jsonify({"error": error_msg}), 500
 
-        platform = detect_platform(url)
 
-        if platform == "unknown":
-            return (
-                jsonify(
-                    {
-                        "error": "Unsupported platform. Please use TikTok or Facebook URLs"
-                    }
-                ),
-                400,
-            )
+def resolve_video_info(url, deadline):
+    """Resolve a video URL into the /api/video-info payload and status code"""
+    if not url:
+        return {"error": "URL is required"}, 400
 
-        print(f"Analyzing {platform.upper()} URL: {url}")
-
-        if platform == "tiktok":
-            if not tiktok_scraper:
-                return jsonify({"error": "TikTok scraper not available"}), 500
-            video_data = tiktok_scraper.get_video_data(url)
-        elif platform == "facebook":
-            if not facebook_scraper:
-                return jsonify({"error": "Facebook scraper not available"}), 500
-            video_data = facebook_scraper.get_video_data(url)
-
-        if "error" in video_data:
-            print(f"Error: {video_data['error']}")
-            return jsonify(video_data), 400
-
-        response_data = {
-            "success": True,
-            "platform": platform,
-            "data": format_video_response(video_data, platform),
-        }
+    platform = detect_platform(url)
+
+    if platform == "unknown":
+        return {
+            "error": "Unsupported platform. Please use TikTok or Facebook URLs"
+        }, 400
+
+    log.info("Analyzing URL", extra={"platform": platform, "url": url})
+
+    scraper = get_scraper(platform)
+    if not scraper:
+        name = "TikTok" if platform == "tiktok" else "Facebook"
+        return {"error": f"{name} scraper not available"}, 500
 
-        print("Successfully processed video info")
-        return jsonify(response_data)
+    with admit("video_info", platform, deadline):
+        with memtrack.stage(platform, "resolve"):
+            video_data = scraper.get_video_data(url, deadline)
 
+    if "error" in video_data:
+        log.info(
+            "Resolution failed",
+            extra={"platform": platform, "error": video_data["error"]},
+        )
+        return video_data, 400
+
+    response_data = {
+        "success": True,
+        "platform": platform,
+        "data": format_video_response(video_data, platform),
+    }
+    if video_data.get("partial"):
+        response_data["partial"] = True
+
+    # The preview card asks for this next; have it cached by then
+    thumbs.cache.prefetch(
+        platform, video_data.get("video_id", ""), video_data.get("thumbnail", "")
+    )
+
+    log.info("Resolved video info", extra={"platform": platform})
+    return response_data, 200
+
+
+# What each platform's video id resolves through
+CANONICAL_VIDEO_URLS = {
+    "tiktok": "https://www.tiktok.com/@_/video/{}",
+    "facebook": "https://www.facebook.com/watch/?v={}",
+}
+
+
+@app.route("/api/video-info/<platform>/<video_id>", methods=["GET"])
+def get_video_info_by_id(platform, video_id):
+    """Cacheable video info lookup by platform and video id"""
+    if platform not in CANONICAL_VIDEO_URLS or not video_id.isdigit():
+        return jsonify({"error": "Unknown platform or malformed video id"}), 404
+
+    deadline = Deadline(REQUEST_DEADLINE)
+    try:
+        url = CANONICAL_VIDEO_URLS[platform].format(video_id)
+        payload, status = resolve_video_info(url, deadline)
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         error_msg = f"Internal server error: {str(e)}"
-        print(error_msg)
-        return jsonify({"error": error_msg}), 500
+        log.exception("Video info lookup failed")
+        payload, status = {"error": error_msg}, 500
+
+    response = jsonify(payload)
+    response.status_code = status
+    if status != 200 or payload.get("partial"):
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    # Edge and browser copies must not outlive the signed URLs inside them
+    max_age = max(0, int(urlexpiry.ttl_for(payload, VIDEO_INFO_MAX_AGE)))
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.s_maxage = max_age
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    return response.make_conditional(request)
+
+
+@contextmanager
+def admit(endpoint, platform, deadline):
+    """Admission slot for an expensive operation, shed while memory is short"""
+    if memtrack.over_ceiling():
+        raise Overloaded("Server is low on memory", MEMORY_RETRY_AFTER)
+
+    max_wait = min(admission.MAX_WAIT, deadline.remaining())
+    with admission.controller.admit(endpoint, platform, max_wait):
+        yield
+
+
+def overloaded_response(error):
+    """Fast 503 for a shed request, telling the client when to come back"""
+    response = jsonify({"error": str(error), "retry_after": error.retry_after})
+    response.status_code = 503
+    response.headers["Retry-After"] = str(error.retry_after)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def sse_response(reporter, on_close=None):
+    """Stream a ProgressReporter to the client as Server-Sent Events"""
+    return Response(
+        sse_stream(reporter, on_close),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/video-info/events", methods=["GET"])
+def video_info_events():
+    """Stream resolution progress as Server-Sent Events, ending with the result"""
+    url = request.args.get("url", "").strip()
+    deadline = Deadline(REQUEST_DEADLINE)
+    reporter = ProgressReporter()
+
+    def resolve():
+        try:
+            with progress.reporting(reporter):
+                payload, status = resolve_video_info(url, deadline)
+        except progress.Cancelled:
+            log.info("Client left, cancelled resolution", extra={"url": url})
+            reporter.finish("cancelled")
+            return
+        except Overloaded as e:
+            payload, status = {"error": str(e), "retry_after": e.retry_after}, 503
+        except Exception as e:
+            payload, status = {"error": f"Internal server error: {str(e)}"}, 500
+
+        if status == 200:
+            reporter.finish("result", **payload)
+        else:
+            reporter.finish("failed", status=status, **payload)
+
+    def stop():
+        if not reporter.finished:
+            reporter.cancel()
+
+    # The resolver's log lines keep this request's id
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(resolve,), daemon=True).start()
+    return sse_response(reporter, on_close=stop)
 
 
 def format_video_response(video_data, platform):
@@ -121,6 +457,9 @@ def format_video_response(video_data, platform):
         "author": video_data.get("author", "Unknown"),
         "duration": video_data.get("duration", "0:00"),
         "thumbnail": video_data.get("thumbnail", ""),
+        "thumbnail_proxy": thumbs.proxy_path(
+            platform, video_data.get("video_id", ""), video_data.get("thumbnail", "")
+        ),
         "video_id": video_data.get("video_id", ""),
         "width": video_data.get("width", 0),
         "height": video_data.get("height", 0),
@@ -133,10 +472,12 @@ def format_video_response(video_data, platform):
                     "no_watermark": video_data.get("video_url_no_watermark"),
                     "watermark": video_data.get("video_url_watermark"),
                     "preview": video_data.get("video_preview_url"),
+                    "audio": video_data.get("audio_url"),
                 },
                 "available_formats": {
                     "no_watermark": bool(video_data.get("video_url_no_watermark")),
                     "watermark": bool(video_data.get("video_url_watermark")),
+                    "audio": bool(video_data.get("audio_url")),
                 },
             }
         )
@@ -148,11 +489,13 @@ def format_video_response(video_data, platform):
                     "sd": video_data.get("video_url_sd"),
                     "auto": video_data.get("video_url_auto"),
                     "preview": video_data.get("video_url_auto"),
+                    "audio": video_data.get("audio_url"),
                 },
                 "available_formats": {
                     "hd": bool(video_data.get("video_url_hd")),
                     "sd": bool(video_data.get("video_url_sd")),
                     "auto": bool(video_data.get("video_url_auto")),
+                    "audio": bool(video_data.get("audio_url")),
                 },
             }
         )
@@ -163,6 +506,7 @@ def format_video_response(video_data, platform):
 @app.route("/api/download", methods=["POST"])
 def download_video():
     """Download video with specified quality"""
+    deadline = Deadline(REQUEST_DEADLINE)
     try:
         data = request.get_json()
         if not data:
@@ -179,29 +523,45 @@ def download_video():
         if platform == "unknown":
             return jsonify({"error": "Unsupported platform"}), 400
 
-        print(f"Downloading {platform} video from: {url}, quality: {quality}")
-
-        if platform == "tiktok":
-            return handle_tiktok_download(url, quality)
-        elif platform == "facebook":
-            return handle_facebook_download(url, quality)
+        log.info(
+            "Downloading video",
+            extra={"platform": platform, "url": url, "quality": quality},
+        )
 
+        # The slot covers resolution and the wait for the first bytes; the
+        # stream itself is shared through fanout and not counted here
+        with admit("download", platform, deadline):
+            with memtrack.stage(platform, "download"):
+                if platform == "tiktok":
+                    return handle_tiktok_download(url, quality, deadline)
+                elif platform == "facebook":
+                    return handle_facebook_download(url, quality, deadline)
+
+    except Overloaded as e:
+        return overloaded_response(e)
     except Exception as e:
         error_msg = f"Download failed: {str(e)}"
-        print(error_msg)
+        log.exception("Download failed")
         return jsonify({"error": error_msg}), 500
 
 
-def handle_tiktok_download(url, quality):
-    """Handle TikTok video download"""
+def download_tiktok_video(url, quality, deadline=None):
+    """Resolve a TikTok video and start (or join) its download.
+
+    Returns {"transfer", "filename"} or {"error", "status"}.
+    """
+    tiktok_scraper = get_scraper("tiktok")
     if not tiktok_scraper:
-        return jsonify({"error": "TikTok scraper not available"}), 500
+        return {"error": "TikTok scraper not available", "status": 500}
 
     no_watermark = quality == "no_watermark"
-    video_data = tiktok_scraper.get_video_data(url)
+    video_data = tiktok_scraper.get_video_data(url, deadline)
 
     if "error" in video_data:
-        return jsonify(video_data), 400
+        return dict(video_data, status=400)
+
+    if quality == "audio":
+        return download_tiktok_audio(tiktok_scraper, video_data)
 
     video_url = None
     if no_watermark:
@@ -210,42 +570,71 @@ def handle_tiktok_download(url, quality):
         video_url = video_data.get("video_url_watermark")
 
     if not video_url:
-        return (
-            jsonify(
-                {
-                    "error": f'Video URL not available for {"no watermark" if no_watermark else "watermark"} format'
-                }
-            ),
-            400,
-        )
+        return {
+            "error": f'Video URL not available for {"no watermark" if no_watermark else "watermark"} format',
+            "status": 400,
+        }
 
-    temp_file_path = tiktok_scraper.download_video_file(video_url, no_watermark)
-    if not temp_file_path:
-        return jsonify({"error": "Failed to download video"}), 500
+    video_id = video_data.get("video_id")
+    variant = "no_watermark" if no_watermark else "watermark"
+    transfer = shared_download(
+        f"tiktok_{video_id}_{variant}" if video_id else None,
+        lambda spool: tiktok_scraper.download_video_file(
+            video_url, no_watermark, video_id, spool
+        ),
+    )
 
     video_id = video_data.get("video_id", "unknown")
     watermark_suffix = "_no_watermark" if no_watermark else "_watermark"
     filename = f"tiktok_{video_id}{watermark_suffix}.mp4"
 
-    cleanup_temp_file(temp_file_path)
+    return {"transfer": transfer, "filename": filename}
 
-    return send_file(
-        temp_file_path,
-        as_attachment=True,
-        download_name=filename,
-        mimetype="video/mp4",
+
+def download_tiktok_audio(tiktok_scraper, video_data):
+    """Start (or join) the download of a TikTok video's soundtrack"""
+    audio_url = video_data.get("audio_url")
+    if not audio_url:
+        return {"error": "Audio not available for this video", "status": 400}
+
+    video_id = video_data.get("video_id")
+    transfer = shared_download(
+        f"tiktok_{video_id}_audio" if video_id else None,
+        lambda spool: tiktok_scraper.download_video_file(
+            audio_url, False, video_id, spool, variant="audio"
+        ),
     )
 
+    extension, mimetype = audio_format(audio_url)
+    filename = f"tiktok_{video_data.get('video_id', 'unknown')}_audio{extension}"
+    return {"transfer": transfer, "filename": filename, "mimetype": mimetype}
 
-def handle_facebook_download(url, quality):
-    """Handle Facebook video download"""
+
+def audio_format(url):
+    """File extension and MIME type for an audio stream URL"""
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    if extension in AUDIO_TYPES:
+        return extension, AUDIO_TYPES[extension]
+    # DASH audio tracks are fragmented MP4 whatever their URL says
+    return ".m4a", "audio/mp4"
+
+
+def download_facebook_video(url, quality, deadline=None):
+    """Resolve a Facebook video and start (or join) its download.
+
+    Returns {"transfer", "filename"} or {"error", "status"}.
+    """
+    facebook_scraper = get_scraper("facebook")
     if not facebook_scraper:
-        return jsonify({"error": "Facebook scraper not available"}), 500
+        return {"error": "Facebook scraper not available", "status": 500}
 
-    video_data = facebook_scraper.get_video_data(url)
+    video_data = facebook_scraper.get_video_data(url, deadline)
 
     if "error" in video_data:
-        return jsonify(video_data), 400
+        return dict(video_data, status=400)
+
+    if quality == "audio":
+        return download_facebook_audio(facebook_scraper, video_data)
 
     video_url = None
     if quality == "hd" and video_data.get("video_url_hd"):
@@ -256,23 +645,403 @@ def handle_facebook_download(url, quality):
         video_url = video_data.get("video_url_auto")
 
     if not video_url:
-        return jsonify({"error": f"Video URL not available for {quality} quality"}), 400
+        return {
+            "error": f"Video URL not available for {quality} quality",
+            "status": 400,
+        }
 
-    temp_file_path = facebook_scraper.download_video_file(video_url, None)
-    if not temp_file_path:
-        return jsonify({"error": "Failed to download video"}), 500
+    video_id = video_data.get("video_id")
+    transfer = shared_download(
+        f"facebook_{video_id}_{quality}" if video_id else None,
+        lambda spool: facebook_scraper.download_video_file(
+            video_url, None, video_id, quality, spool
+        ),
+    )
 
     video_id = video_data.get("video_id", "unknown")
     filename = f"facebook_{video_id}_{quality}.mp4"
 
-    cleanup_temp_file(temp_file_path)
+    return {"transfer": transfer, "filename": filename}
+
+
+def download_facebook_audio(facebook_scraper, video_data):
+    """Start (or join) the download of a Facebook video's DASH audio track"""
+    audio_url = video_data.get("audio_url")
+    if not audio_url:
+        return {"error": "Audio not available for this video", "status": 400}
+
+    video_id = video_data.get("video_id")
+    transfer = shared_download(
+        f"facebook_{video_id}_audio" if video_id else None,
+        lambda spool: facebook_scraper.download_video_file(
+            audio_url, None, video_id, "audio", spool
+        ),
+    )
+
+    extension, mimetype = audio_format(audio_url)
+    filename = f"facebook_{video_data.get('video_id', 'unknown')}_audio{extension}"
+    return {"transfer": transfer, "filename": filename, "mimetype": mimetype}
+
+
+def shared_download(key, download):
+    """Join the upstream download for key, or start download(spool) for it"""
+
+    def produce(spool):
+        temp_file_path = download(spool)
+        if temp_file_path:
+            cleanup_temp_file(temp_file_path)
+        return temp_file_path
+
+    return fanout.attach(key, produce)
+
+
+def send_download(result):
+    """Turn a download result into a file, live stream or error response"""
+    if "error" in result:
+        error = dict(result)
+        status = error.pop("status", 500)
+        return jsonify(error), status
+
+    mimetype = result.get("mimetype", "video/mp4")
+    transfer = result.get("transfer")
+    if transfer is None:
+        return send_file(
+            result["file_path"],
+            as_attachment=True,
+            download_name=result["filename"],
+            mimetype=mimetype,
+        )
+
+    if not transfer.wait_ready(DOWNLOAD_START_TIMEOUT):
+        transfer.detach()
+        return jsonify({"error": "Download did not start in time"}), 504
+    if transfer.error:
+        transfer.detach()
+        return jsonify({"error": transfer.error}), 500
+    if transfer.done:
+        transfer.detach()
+        return send_file(
+            transfer.path,
+            as_attachment=True,
+            download_name=result["filename"],
+            mimetype=mimetype,
+        )
+
+    # Still downloading: replay what is on disk, then follow the live tail
+    headers = {"Content-Disposition": f"attachment; filename={result['filename']}"}
+    if transfer.total:
+        headers["Content-Length"] = str(transfer.total)
+    # Not direct_passthrough: werkzeug only runs close callbacks on wrapped bodies
+    response = Response(transfer.iter_bytes(), mimetype=mimetype, headers=headers)
+    response.call_on_close(transfer.detach)
+    return response
+
+
+def wait_for_download(result, platform):
+    """Block a background job until its shared download is on disk"""
+    transfer = result.pop("transfer", None)
+    if transfer is None:
+        return result
+
+    try:
+        result["file_path"] = transfer.wait(
+            progress.bound("download", platform=platform)
+        )
+    except IOError as e:
+        return {"error": str(e), "status": 500}
+    finally:
+        transfer.detach()
+    return result
+
+
+def handle_tiktok_download(url, quality, deadline=None):
+    """Handle TikTok video download"""
+    return send_download(download_tiktok_video(url, quality, deadline))
+
+
+def handle_facebook_download(url, quality, deadline=None):
+    """Handle Facebook video download"""
+    return send_download(download_facebook_video(url, quality, deadline))
+
+
+@app.route("/api/bundle", methods=["POST"])
+def download_bundle():
+    """Stream several videos to the client as one ZIP archive"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    items = []
+    default_quality = data.get("quality")
+    for item in data.get("items") or data.get("urls") or []:
+        if isinstance(item, dict):
+            url, quality = item.get("url"), item.get("quality", default_quality)
+        else:
+            url, quality = item, default_quality
+        if not isinstance(url, str) or not url.strip():
+            return jsonify({"error": "Every item needs a URL"}), 400
+        items.append((url.strip(), quality))
+
+    if not items:
+        return jsonify({"error": "URLs are required"}), 400
+    if len(items) > BUNDLE_MAX_ITEMS:
+        return (
+            jsonify({"error": f"At most {BUNDLE_MAX_ITEMS} videos per bundle"}),
+            400,
+        )
+
+    # The slot is held until the last byte of the archive has been sent
+    slot = ExitStack()
+    try:
+        slot.enter_context(admit("bundle", "mixed", Deadline(REQUEST_DEADLINE)))
+    except Overloaded as e:
+        return overloaded_response(e)
+
+    log.info("Streaming bundle", extra={"items": len(items)})
+    filename = f"videos_{datetime.now():%Y%m%d_%H%M%S}.zip"
+    response = Response(
+        stream_with_context(bundle.iter_zip(bundle_entries(items))),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
+    response.call_on_close(slot.close)
+    return response
+
+
+def bundle_entries(items):
+    """Archive entries for a bundle, in the order their videos resolve.
 
-    return send_file(
-        temp_file_path,
-        as_attachment=True,
-        download_name=filename,
-        mimetype="video/mp4",
+    Every item ends up as a record in the closing manifest, with the error
+    that kept it out of the archive if there was one.
+    """
+    records = []
+    executor = ThreadPoolExecutor(
+        min(BUNDLE_RESOLVE_WORKERS, len(items)), thread_name_prefix="bundle"
     )
+    futures = [
+        executor.submit(
+            contextvars.copy_context().run, resolve_bundle_item, index, url, quality
+        )
+        for index, (url, quality) in enumerate(items)
+    ]
+    names = bundle.UniqueNames()
+    try:
+        for future in as_completed(futures):
+            record, stream_url = future.result()
+            records.append(record)
+            if not stream_url:
+                continue
+
+            platform = record["platform"]
+            try:
+                response = get_scraper(platform).session.get(
+                    stream_url,
+                    headers=BUNDLE_STREAM_HEADERS.get(platform),
+                    stream=True,
+                    timeout=60,
+                )
+                response.raise_for_status()
+            except Exception as e:
+                record.update(status="failed", error=f"Download failed: {str(e)}")
+                continue
+
+            if record["quality"] == "audio":
+                extension = audio_format(stream_url)[0]
+            else:
+                extension = ".mp4"
+            record["file"] = names.claim(
+                f"{platform}_{record['video_id']}_{record['quality']}{extension}"
+            )
+            length = response.headers.get("Content-Length", "")
+            size = (
+                int(length)
+                if length.isdigit() and not response.headers.get("Content-Encoding")
+                else None
+            )
+            yield record["file"], bundle_chunks(response, record), size
+
+        yield bundle.manifest_entry(records)
+        log.info(
+            "Bundle finished",
+            extra={
+                "items": len(records),
+                "failed": sum(1 for r in records if r.get("status") != "ok"),
+            },
+        )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def resolve_bundle_item(index, url, quality):
+    """Resolve one bundle item to (manifest record, stream URL or None)"""
+    platform = detect_platform(url)
+    quality = quality or BUNDLE_DEFAULT_QUALITY.get(platform)
+    record = {"index": index, "url": url, "platform": platform, "quality": quality}
+
+    def failed(error):
+        record.update(status="failed", error=error)
+        return record, None
+
+    if platform == "unknown":
+        return failed("Unsupported platform")
+    scraper = get_scraper(platform)
+    if not scraper:
+        return failed(f"{platform.capitalize()} scraper not available")
+
+    deadline = Deadline(REQUEST_DEADLINE)
+    try:
+        with admit("video_info", platform, deadline):
+            video_data = scraper.get_video_data(url, deadline)
+    except Overloaded as e:
+        return failed(str(e))
+    except Exception as e:
+        log.exception("Bundle item failed to resolve")
+        return failed(f"Resolution failed: {str(e)}")
+
+    if "error" in video_data:
+        return failed(video_data["error"])
+
+    record["video_id"] = video_data.get("video_id", "unknown")
+    record["title"] = video_data.get("title", "")
+    stream_url = stream_url_for(platform, video_data, quality)
+    if not stream_url:
+        return failed(f"{quality} format not available for this video")
+    return record, stream_url
+
+
+def stream_url_for(platform, video_data, quality):
+    """The upstream URL /api/download would fetch for this quality"""
+    if quality == "audio":
+        return video_data.get("audio_url")
+    if platform == "tiktok":
+        if quality == "no_watermark":
+            return video_data.get("video_url_no_watermark")
+        return video_data.get("video_url_watermark")
+    if quality in ("hd", "sd") and video_data.get(f"video_url_{quality}"):
+        return video_data.get(f"video_url_{quality}")
+    return video_data.get("video_url_auto")
+
+
+def bundle_chunks(response, record):
+    """Body of one bundle entry; a transfer that breaks off is noted, not raised"""
+    record["bytes"] = 0
+    try:
+        for view in read_chunks(response):
+            yield view
+            record["bytes"] += len(view)
+        record["status"] = "ok"
+    except IOError as e:
+        # The partial entry is already in the archive; the manifest says so
+        record.update(status="truncated", error=f"Transfer broke off: {str(e)}")
+    finally:
+        response.close()
+
+
+def run_download_job(url, platform, quality):
+    """Run one queued download on a background worker"""
+    deadline = Deadline(JOB_DEADLINE)
+    if platform == "tiktok":
+        result = download_tiktok_video(url, quality, deadline)
+    else:
+        result = download_facebook_video(url, quality, deadline)
+    return wait_for_download(result, platform)
+
+
+job_queue = JobQueue(run_download_job)
+
+
+def job_response(job):
+    """Job status plus the URLs to poll and fetch it"""
+    data = job.to_dict()
+    data["status_url"] = url_for("job_status", job_id=job.id)
+    data["events_url"] = url_for("job_events", job_id=job.id)
+    data["result_url"] = url_for("job_result", job_id=job.id)
+    return data
+
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """Queue a download and return its job id straight away"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "No data provided"}), 400
+
+        url = data.get("url", "").strip()
+        quality = data.get("quality", "auto")
+        priority = data.get("priority", "normal")
+
+        if not url:
+            return jsonify({"error": "URL is required"}), 400
+
+        platform = detect_platform(url)
+
+        if platform == "unknown":
+            return jsonify({"error": "Unsupported platform"}), 400
+
+        if priority not in PRIORITIES:
+            return jsonify({"error": f"Invalid priority: {priority}"}), 400
+
+        job = job_queue.submit(
+            (platform, url, quality),
+            {"url": url, "platform": platform, "quality": quality},
+            priority,
+        )
+        log.info(
+            "Queued download job",
+            extra={"job_id": job.id, "platform": platform, "quality": quality},
+        )
+        return jsonify(job_response(job)), 202
+
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        error_msg = f"Failed to queue job: {str(e)}"
+        log.exception("Failed to queue job")
+        return jsonify({"error": error_msg}), 500
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Poll the status of a download job"""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found or expired"}), 404
+    return jsonify(job_response(job))
+
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Stream a job's progress as Server-Sent Events until it finishes"""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found or expired"}), 404
+
+    job_queue.watch(job)
+    return sse_response(job.reporter, on_close=lambda: job_queue.unwatch(job))
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def job_result(job_id):
+    """Fetch the file of a finished download job"""
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found or expired"}), 404
+
+    if job.status == "failed":
+        return jsonify({"error": job.error}), job.error_status
+
+    if job.status != "done":
+        return jsonify(job_response(job)), 202
+
+    if not os.path.exists(job.result["file_path"]):
+        return jsonify({"error": "Job result has expired"}), 410
+
+    return send_download(job.result)
 
 
 @app.route("/api/proxy-video", methods=["POST"])
@@ -293,25 +1062,48 @@ def proxy_video():
             "Accept": "video/webm,video/ogg,video/*;q=0.9,*/*;q=0.5",
         }
 
-        if tiktok_scraper:
-            response = tiktok_scraper.session.get(
-                video_url, headers=headers, stream=True, timeout=30
-            )
-            response.raise_for_status()
-
-            return send_file(
-                response.raw,
-                mimetype="video/mp4",
-                as_attachment=False,
-                download_name="preview.mp4",
-            )
-        else:
-            return jsonify({"error": "Scraper not available"}), 500
+        response = get_proxy_session().get(
+            video_url, headers=headers, stream=True, timeout=30
+        )
+        response.raise_for_status()
+
+        proxy_headers = {"Content-Disposition": "inline; filename=preview.mp4"}
+        if "Content-Length" in response.headers and not response.headers.get(
+            "Content-Encoding"
+        ):
+            proxy_headers["Content-Length"] = response.headers["Content-Length"]
+
+        return Response(
+            iter_response(response),
+            mimetype="video/mp4",
+            headers=proxy_headers,
+            direct_passthrough=True,
+        )
 
     except Exception as e:
         return jsonify({"error": f"Proxy failed: {str(e)}"}), 500
 
 
+@app.route("/api/thumbnail/<platform>/<video_id>", methods=["GET"])
+def thumbnail(platform, video_id):
+    """Video thumbnail served from our cache, fetched from ?src= on a miss"""
+    if platform not in CANONICAL_VIDEO_URLS or not video_id.isdigit():
+        return jsonify({"error": "Unknown platform or malformed video id"}), 404
+
+    image = thumbs.cache.get(platform, video_id, request.args.get("src", ""))
+    if image is None:
+        response = jsonify({"error": "Thumbnail unavailable"})
+        response.status_code = 502
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    response = Response(image.data, mimetype=image.content_type)
+    response.set_etag(image.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = thumbs.MAX_AGE
+    return response.make_conditional(request)
+
+
 @app.route("/health", methods=["GET"])
 def health_check():
     """Health check endpoint"""
@@ -322,13 +1114,92 @@ def health_check():
             "version": "3.0.0",
             "supported_platforms": ["tiktok", "facebook"],
             "modules": {
-                "tiktok_scraper": "active" if tiktok_scraper else "inactive",
-                "facebook_scraper": "active" if facebook_scraper else "inactive",
+                "tiktok_scraper": scraper_status("tiktok"),
+                "facebook_scraper": scraper_status("facebook"),
             },
         }
     )
 
 
+def scraper_status(platform):
+    if platform not in scrapers:
+        return "not loaded"
+    return "active" if scrapers[platform] else "inactive"
+
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics():
+    """Runtime metrics for monitoring"""
+    from transport import pool_stats
+    from ratelimit import limiter
+    import extraction
+
+    return jsonify(
+        {
+            "timestamp": datetime.now().isoformat(),
+            "transport": pool_stats(),
+            "rate_limits": limiter.stats(),
+            "jobs": job_queue.stats(),
+            "downloads": fanout.stats(),
+            "metadata_store": metastore.stats(),
+            "compression": compression.stats(),
+            "negative_cache": negcache.stats(),
+            "extraction": extraction.stats(),
+            "admission": admission.controller.stats(),
+            "memory": memtrack.stats(),
+            "logging": logs.stats(),
+            "profiler": profiler.stats(),
+            "thumbnails": thumbs.cache.stats(),
+            "bundles": bundle.stats(),
+        }
+    )
+
+
+def admin_error():
+    # Without a token configured the admin endpoints do not exist
+    if not profiler.PROFILE_TOKEN:
+        return jsonify({"error": "Endpoint not found"}), 404
+    return jsonify({"error": "Admin token required"}), 401
+
+
+def profile_response(collapsed, samples=None):
+    headers = {"Cache-Control": "no-store"}
+    if samples is not None:
+        headers["X-Profile-Samples"] = str(samples)
+    return Response(collapsed, mimetype="text/plain", headers=headers)
+
+
+@app.route("/api/admin/profile", methods=["GET"])
+def profile_process():
+    """Sample every thread for ?seconds= and return collapsed stacks"""
+    if not is_admin():
+        return admin_error()
+    try:
+        seconds = float(request.args.get("seconds", "10"))
+        interval = float(request.args.get("interval_ms", "5")) / 1000
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    if not (math.isfinite(seconds) and math.isfinite(interval)):
+        return jsonify({"error": "seconds and interval_ms must be finite"}), 400
+
+    try:
+        sampler = profiler.profile_all(seconds, interval)
+    except profiler.Busy as e:
+        return jsonify({"error": str(e)}), 409
+    return profile_response(sampler.collapsed(), sampler.samples)
+
+
+@app.route("/api/admin/profile/<request_id>", methods=["GET"])
+def profile_of_request(request_id):
+    """Collapsed stacks of a request that was sent with X-Profile: 1"""
+    if not is_admin():
+        return admin_error()
+    collapsed = profiler.request_profile(request_id)
+    if collapsed is None:
+        return jsonify({"error": "No profile for that request"}), 404
+    return profile_response(collapsed)
+
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -0,0 +1,144 @@
+import os
+import gc
+import sys
+import time
+import threading
+import tracemalloc
+
+# tracemalloc slows allocation noticeably, so stage accounting is opt-in
+TRACE = os.environ.get("MEMORY_TRACE") == "1"
+TRACE_FRAMES = int(os.environ.get("MEMORY_TRACE_FRAMES", "1"))
+# Shed new resolutions above this resident size; 0 disables the guard
+CEILING_MB = float(os.environ.get("MEMORY_CEILING_MB", "0"))
+# A full collection is expensive; run at most one per interval under pressure
+COLLECT_INTERVAL = 5.0
+
+_lock = threading.Lock()
+_active = set()
+_stages = {}
+_guard = {"shed": 0, "collections": 0, "last_collect": 0.0}
+
+if TRACE:
+    tracemalloc.start(TRACE_FRAMES)
+
+
+def rss_bytes():
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        # Peak rather than current RSS, the best that is portable
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class _Stage:
+    """Peak traced memory while a stage runs, above the level it started at.
+
+    tracemalloc keeps one process-wide peak, so every entry folds the
+    current peak into the stages already running before resetting it.
+    Overlapping stages therefore each see the process peak of their own
+    window: exact when requests do not overlap, an upper bound when they do.
+    """
+
+    def __init__(self, platform, name):
+        self.key = f"{platform}.{name}"
+        self.baseline = 0
+        self.peak = 0
+
+    def __enter__(self):
+        with _lock:
+            current, peak = tracemalloc.get_traced_memory()
+            for stage in _active:
+                stage.peak = max(stage.peak, peak)
+            tracemalloc.reset_peak()
+            self.baseline = self.peak = current
+            _active.add(self)
+        return self
+
+    def __exit__(self, *exc):
+        with _lock:
+            _, peak = tracemalloc.get_traced_memory()
+            _active.discard(self)
+            used = max(self.peak, peak) - self.baseline
+            stats = _stages.setdefault(
+                self.key, {"count": 0, "total_bytes": 0, "max_bytes": 0}
+            )
+            stats["count"] += 1
+            stats["total_bytes"] += used
+            stats["max_bytes"] = max(stats["max_bytes"], used)
+        return False
+
+
+class _Untraced:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_UNTRACED = _Untraced()
+
+
+def stage(platform, name):
+    """Context manager accounting the peak memory of one request stage"""
+    if not TRACE:
+        return _UNTRACED
+    return _Stage(platform, name)
+
+
+def over_ceiling():
+    """True when RSS is above MEMORY_CEILING_MB and new work should be shed.
+
+    Crossing the ceiling first triggers a rate-limited gc.collect(), in
+    case cyclic garbage is what is holding the memory.
+    """
+    if CEILING_MB <= 0:
+        return False
+
+    ceiling = CEILING_MB * 1024 * 1024
+    if rss_bytes() < ceiling:
+        return False
+
+    now = time.monotonic()
+    with _lock:
+        collect = now - _guard["last_collect"] >= COLLECT_INTERVAL
+        if collect:
+            _guard["last_collect"] = now
+            _guard["collections"] += 1
+    if collect:
+        gc.collect()
+        if rss_bytes() < ceiling:
+            return False
+
+    with _lock:
+        _guard["shed"] += 1
+    return True
+
+
+def stats():
+    with _lock:
+        stages = {}
+        for key, values in _stages.items():
+            stages[key] = {
+                "count": values["count"],
+                "mean_kb": round(values["total_bytes"] / values["count"] / 1024, 1),
+                "max_kb": round(values["max_bytes"] / 1024, 1),
+            }
+        guard = {k: v for k, v in _guard.items() if k != "last_collect"}
+
+    data = {
+        "rss_mb": round(rss_bytes() / (1024 * 1024), 1),
+        "ceiling_mb": CEILING_MB or None,
+        "tracing": TRACE,
+        "stages": stages,
+        **guard,
+    }
+    if TRACE:
+        current, _ = tracemalloc.get_traced_memory()
+        data["traced_mb"] = round(current / (1024 * 1024), 1)
+    return data
@@ -0,0 +1,210 @@
+import os
+import logging
+import json
+import time
+import sqlite3
+import threading
+import contextvars
+
+log = logging.getLogger(__name__)
+
+# Unset leaves the store disabled and every lookup a miss
+DB_PATH = os.environ.get("METADATA_DB")
+MAX_ENTRIES = int(os.environ.get("METADATA_DB_MAX_ENTRIES", "50000"))
+SWEEP_INTERVAL = 60
+
+# Used for data without signed URLs; otherwise their expiry decides
+VIDEO_TTL = float(os.environ.get("METADATA_VIDEO_TTL", "300"))
+PROBE_TTL = float(os.environ.get("METADATA_PROBE_TTL", "300"))
+# Short links always point at the same video
+SHORT_LINK_TTL = float(os.environ.get("METADATA_SHORT_LINK_TTL", "86400"))
+# Entries read this close to expiry are re-resolved in the background
+REFRESH_AHEAD = float(os.environ.get("METADATA_REFRESH_AHEAD", "60"))
+# Budget for one background refresh; no client is waiting on it
+REFRESH_DEADLINE = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+"""
+
+
+class MetadataStore:
+    """Key/value store in SQLite shared by every worker process on the host.
+
+    WAL mode lets readers in any process run while one process writes.
+    Each thread gets its own connection. Expired rows are removed in bulk at
+    most once a minute, and the soonest-expiring rows are dropped once the
+    table grows past max_entries. A broken or locked database is reported
+    and treated as a miss, never as a failed request.
+
+    Reads of an entry that is about to expire can trigger a background
+    refresh, so videos that keep being requested never go cold.
+    """
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.refreshes = 0
+        self._refreshing = set()
+        self._local = threading.local()
+        self._last_sweep = 0
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key, refresh=None):
+        """Stored value or None; refresh() runs in the background near expiry"""
+        now = time.time()
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT value, expires_at FROM entries"
+                    " WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (namespace, key, now),
+                )
+                .fetchone()
+            )
+        except (sqlite3.Error, OSError) as e:
+            self.errors += 1
+            log.warning("Metadata store read failed", extra={"error": str(e)})
+            return None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if refresh and row[1] - now < REFRESH_AHEAD:
+            self._refresh(namespace, key, refresh)
+        return json.loads(row[0])
+
+    def _refresh(self, namespace, key, refresh):
+        with self._lock:
+            if (namespace, key) in self._refreshing:
+                return
+            self._refreshing.add((namespace, key))
+            self.refreshes += 1
+
+        def run():
+            try:
+                refresh()
+            except Exception as e:
+                log.warning(
+                    "Background refresh failed",
+                    extra={"namespace": namespace, "key": key, "error": str(e)},
+                )
+            finally:
+                with self._lock:
+                    self._refreshing.discard((namespace, key))
+
+        threading.Thread(
+            target=contextvars.copy_context().run, args=(run,), daemon=True
+        ).start()
+
+    def put(self, namespace, key, value, ttl):
+        if ttl <= 0:
+            return
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at)"
+                " VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time() + ttl),
+            )
+        except (sqlite3.Error, OSError) as e:
+            self.errors += 1
+            log.warning("Metadata store write failed", extra={"error": str(e)})
+            return
+        self.sweep()
+
+    def sweep(self, force=False):
+        """Delete expired rows and trim the table back to max_entries"""
+        with self._lock:
+            now = time.time()
+            if not force and now - self._last_sweep < SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM entries WHERE (namespace, key) IN ("
+                    " SELECT namespace, key FROM entries"
+                    " ORDER BY expires_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+        except (sqlite3.Error, OSError) as e:
+            self.errors += 1
+            log.warning("Metadata store sweep failed", extra={"error": str(e)})
+
+    def stats(self):
+        stats = {
+            "enabled": True,
+            "path": self.path,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "refreshes": self.refreshes,
+        }
+        try:
+            stats["entries"] = (
+                self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            )
+        except (sqlite3.Error, OSError):
+            pass
+        return stats
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def store():
+    """The process-wide store, or None when METADATA_DB is not set"""
+    global _store
+    if not DB_PATH:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = MetadataStore(DB_PATH)
+        return _store
+
+
+def get(namespace, key, refresh=None):
+    metadata = store()
+    return metadata.get(namespace, key, refresh) if metadata else None
+
+
+def put(namespace, key, value, ttl):
+    metadata = store()
+    if metadata:
+        metadata.put(namespace, key, value, ttl)
+
+
+def stats():
+    metadata = store()
+    return metadata.stats() if metadata else {"enabled": False}
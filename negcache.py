@@ -0,0 +1,99 @@
+import os
+import logging
+import time
+import threading
+
+import metastore
+
+log = logging.getLogger(__name__)
+
+# Error class -> seconds a failure is answered from cache
+NEGATIVE_TTLS = {
+    # The URL itself can never resolve
+    "malformed": float(os.environ.get("NEGATIVE_TTL_MALFORMED", "86400")),
+    # Removed or private; it may come back, so not for long
+    "not_found": float(os.environ.get("NEGATIVE_TTL_NOT_FOUND", "600")),
+    # Timeouts, throttling, upstream errors: only soak up retry bursts
+    "upstream": float(os.environ.get("NEGATIVE_TTL_UPSTREAM", "15")),
+}
+MALFORMED_ERRORS = (
+    "Invalid Facebook URL",
+    "Could not extract video ID",
+)
+# A page without video data is left out: block and captcha pages lack it too
+NOT_FOUND_ERRORS = (
+    "No video URLs found",
+    "TikTok video is unavailable",
+)
+# Process-local fallback when the shared metadata store is disabled
+MAX_LOCAL_ENTRIES = 10000
+
+_local = {}
+_lock = threading.Lock()
+_counts = {"hits": 0, "stored": 0}
+
+
+def classify(error):
+    if error.startswith(MALFORMED_ERRORS):
+        return "malformed"
+    if error.startswith(NOT_FOUND_ERRORS):
+        return "not_found"
+    return "upstream"
+
+
+def lookup(platform, key):
+    """Cached failure for key as a get_video_data error dict, or None"""
+    cache_key = f"{platform}:{key}"
+    if metastore.store():
+        entry = metastore.get("negative", cache_key)
+    else:
+        with _lock:
+            expires_at, entry = _local.get(cache_key, (0, None))
+            if expires_at <= time.time():
+                entry = None
+
+    if entry is None:
+        return None
+    with _lock:
+        _counts["hits"] += 1
+    log.debug(
+        "Answering from cached failure",
+        extra={"key": cache_key, "error_class": entry["error_class"]},
+    )
+    return {"error": entry["error"]}
+
+
+def remember(platform, key, result, error_class=None):
+    """Cache a get_video_data error for as long as its class allows"""
+    error_class = error_class or classify(result["error"])
+    ttl = NEGATIVE_TTLS[error_class]
+    entry = {"error": result["error"], "error_class": error_class}
+    cache_key = f"{platform}:{key}"
+
+    with _lock:
+        _counts["stored"] += 1
+    if metastore.store():
+        metastore.put("negative", cache_key, entry, ttl)
+        return
+
+    with _lock:
+        now = time.time()
+        if len(_local) >= MAX_LOCAL_ENTRIES:
+            for stale in [
+                k for k, (expires_at, _) in _local.items() if expires_at <= now
+            ]:
+                del _local[stale]
+        while len(_local) >= MAX_LOCAL_ENTRIES:
+            del _local[next(iter(_local))]
+        _local[cache_key] = (now + ttl, entry)
+
+
+def stats():
+    with _lock:
+        return {
+            "ttls": NEGATIVE_TTLS,
+            "shared": bool(metastore.store()),
+            "local_entries": len(_local),
+            "hits": _counts["hits"],
+            "stored": _counts["stored"],
+        }
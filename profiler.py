@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter, OrderedDict
+
+# Admin token for the profiling endpoints; unset disables them entirely
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+MAX_SECONDS = 60
+DEFAULT_INTERVAL = 0.005
+MIN_INTERVAL = 0.001
+# Single-request profiles kept for retrieval, newest last
+MAX_REQUEST_PROFILES = 32
+
+_lock = threading.Lock()
+_running = 0
+_request_profiles = OrderedDict()
+_counts = {"profiles": 0, "request_profiles": 0, "samples": 0}
+
+
+class Busy(Exception):
+    pass
+
+
+def frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapse(frame):
+    """Stack from the outermost frame down, as flamegraph.pl expects"""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class Sampler:
+    """Samples Python stacks from a background thread.
+
+    Nothing is installed in the interpreter: the sampler reads
+    sys._current_frames() on its own thread, so the profiled code pays
+    only for the GIL hand-offs while it runs and nothing at all otherwise.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_id=None):
+        self.interval = max(MIN_INTERVAL, interval)
+        self.thread_id = thread_id
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        frames = sys._current_frames()
+        if self.thread_id is not None:
+            frames = {self.thread_id: frames.get(self.thread_id)}
+        for ident, frame in frames.items():
+            if ident == own or frame is None:
+                continue
+            thread = names.get(ident, str(ident)).replace(";", ",")
+            self.stacks[f"{thread};{collapse(frame)}"] += 1
+        self.samples += 1
+
+    def _run(self):
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            self._sample()
+            next_at += self.interval
+            delay = next_at - time.perf_counter()
+            if delay < 0:
+                # Fell behind; sample at the set rate from now on
+                next_at = time.perf_counter()
+                delay = 0
+            self._stop.wait(delay)
+
+    def start(self):
+        global _running
+        with _lock:
+            # Whole-process profiles already cover every request
+            if _running and self.thread_id is None:
+                raise Busy("A profile is already running")
+            _running += 1
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        global _running
+        self._stop.set()
+        self._thread.join()
+        with _lock:
+            _running -= 1
+            _counts["samples"] += self.samples
+        return self
+
+    def collapsed(self):
+        """One "frame;frame;frame count" line per distinct stack"""
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+def profile_all(seconds, interval=DEFAULT_INTERVAL):
+    """Sample every thread for the given number of seconds"""
+    seconds = min(MAX_SECONDS, max(0.0, seconds))
+    sampler = Sampler(interval).start()
+    try:
+        time.sleep(seconds)
+    finally:
+        sampler.stop()
+    with _lock:
+        _counts["profiles"] += 1
+    return sampler
+
+
+def start_request(interval=DEFAULT_INTERVAL):
+    """Sample only the calling thread until finish_request()"""
+    return Sampler(interval, threading.get_ident()).start()
+
+
+def finish_request(request_id, sampler):
+    sampler.stop()
+    with _lock:
+        _counts["request_profiles"] += 1
+        _request_profiles[request_id] = sampler.collapsed()
+        _request_profiles.move_to_end(request_id)
+        while len(_request_profiles) > MAX_REQUEST_PROFILES:
+            _request_profiles.popitem(last=False)
+
+
+def request_profile(request_id):
+    with _lock:
+        return _request_profiles.get(request_id)
+
+
+def stats():
+    with _lock:
+        return {
+            "enabled": bool(PROFILE_TOKEN),
+            "running": _running,
+            "stored_request_profiles": len(_request_profiles),
+            **_counts,
+        }
@@ -0,0 +1,145 @@
+import json
+import time
+import itertools
+import threading
+from contextlib import contextmanager
+
+# Minimum gap between two byte-count events from one download
+BYTES_EVENT_INTERVAL = 0.25
+# Listeners get a comment line this often so proxies keep the stream open
+HEARTBEAT_INTERVAL = 15
+
+_local = threading.local()
+
+
+class Cancelled(BaseException):
+    """Raised inside a task whose listeners have all gone away.
+
+    Derived from BaseException so the broad `except Exception` blocks in the
+    scrapers let it through instead of carrying on with the next stage.
+    """
+
+
+class ProgressReporter:
+    """Stage events from one running task, replayable by any number of listeners"""
+
+    def __init__(self):
+        self.events = []
+        self.finished = False
+        self.cancelled = False
+        self._sequence = itertools.count(1)
+        self._condition = threading.Condition()
+
+    def emit(self, stage, **data):
+        if self.cancelled:
+            raise Cancelled()
+
+        event = {"stage": stage, "time": round(time.time(), 3)}
+        event.update(data)
+        with self._condition:
+            event["seq"] = next(self._sequence)
+            # Byte counts only matter as the latest value, don't pile them up
+            if self.events and stage == "download" == self.events[-1]["stage"]:
+                self.events[-1] = event
+            else:
+                self.events.append(event)
+            self._condition.notify_all()
+
+    def finish(self, stage, **data):
+        event = {"stage": stage, "time": round(time.time(), 3)}
+        event.update(data)
+        with self._condition:
+            event["seq"] = next(self._sequence)
+            self.events.append(event)
+            self.finished = True
+            self._condition.notify_all()
+
+    def cancel(self):
+        with self._condition:
+            self.cancelled = True
+            self._condition.notify_all()
+
+    def latest(self):
+        with self._condition:
+            return self.events[-1] if self.events else None
+
+    def listen(self, heartbeat=HEARTBEAT_INTERVAL):
+        """Yield past events, then new ones as they come; None means heartbeat"""
+        last_seq = 0
+        while True:
+            with self._condition:
+                if not self.finished and (
+                    not self.events or self.events[-1]["seq"] <= last_seq
+                ):
+                    self._condition.wait(heartbeat)
+                new = [event for event in self.events if event["seq"] > last_seq]
+                finished = self.finished
+
+            if new:
+                last_seq = new[-1]["seq"]
+            elif not finished:
+                yield None
+            yield from new
+            if finished:
+                return
+
+
+def current():
+    return getattr(_local, "reporter", None)
+
+
+@contextmanager
+def reporting(reporter):
+    """Send progress emitted on this thread to reporter"""
+    previous = current()
+    _local.reporter = reporter
+    try:
+        yield reporter
+    finally:
+        _local.reporter = previous
+
+
+def emit(stage, **data):
+    reporter = current()
+    if reporter is not None:
+        reporter.emit(stage, **data)
+
+
+def bound(stage, **fixed):
+    """Callback that emits to this thread's reporter from any thread.
+
+    Used for download byte counts, which are produced on segment worker
+    threads that have no reporter of their own. Returns None when nobody is
+    listening so callers can skip the bookkeeping entirely.
+    """
+    reporter = current()
+    if reporter is None:
+        return None
+
+    last_sent = [0.0]
+
+    def callback(**data):
+        now = time.monotonic()
+        done = data.get("bytes") == data.get("total")
+        if done or now - last_sent[0] >= BYTES_EVENT_INTERVAL:
+            last_sent[0] = now
+            reporter.emit(stage, **fixed, **data)
+
+    return callback
+
+
+def sse_stream(reporter, on_close=None):
+    """Format reporter events as a text/event-stream body"""
+    try:
+        for event in reporter.listen():
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield (
+                f"id: {event['seq']}\n"
+                f"event: {event['stage']}\n"
+                f"data: {json.dumps(event)}\n\n"
+            )
+    finally:
+        if on_close:
+            on_close()
@@ -0,0 +1,181 @@
+import os
+import logging
+import time
+import threading
+from email.utils import parsedate_to_datetime
+
+import requests
+
+log = logging.getLogger(__name__)
+
+# host suffix = requests per second : burst
+DEFAULT_RATE_LIMITS = (
+    "m.facebook.com=2:4,"
+    "facebook.com=2:4,"
+    "tiktokv.com=5:10,"
+    "tiktok.com=5:10,"
+    "fbcdn.net=20:40,"
+    "tiktokcdn.com=20:40,"
+    "tiktokcdn-us.com=20:40,"
+    "byteoversea.com=20:40"
+)
+# Longest a caller will queue for a token before giving up
+MAX_WAIT = float(os.environ.get("RATE_LIMIT_MAX_WAIT", "15"))
+DEFAULT_RETRY_AFTER = 5.0
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    pass
+
+
+def parse_rate_limits(value):
+    limits = {}
+    for item in value.split(","):
+        host, _, spec = item.strip().partition("=")
+        rate, _, burst = spec.partition(":")
+        try:
+            limits[host.lower()] = (float(rate), float(burst or rate))
+        except ValueError:
+            continue
+    return limits
+
+
+def parse_retry_after(value):
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of spinning.
+
+    Tokens may go negative: each caller takes one immediately and sleeps for
+    as long as the deficit needs to refill, so waiters queue up fairly. A
+    429 halves the rate and blocks the bucket for Retry-After seconds; the
+    rate then climbs back towards its configured value on success.
+    """
+
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        # Refills start from here; a 429 pushes it into the future
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.throttled = 0
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+
+    def reserve(self, max_wait=MAX_WAIT):
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            wait = max(0.0, self.updated - now) + max(
+                0.0, (1 - self.tokens) / self.rate
+            )
+            if wait > max_wait:
+                raise RateLimitExceeded(
+                    f"Upstream rate limit would need a {wait:.1f}s wait"
+                )
+
+            self.tokens -= 1
+            self.requests += 1
+            if wait > 0:
+                self.waits += 1
+                self.waited_seconds += wait
+            return wait
+
+    def throttle(self, retry_after):
+        with self.lock:
+            self.throttled += 1
+            self.rate = max(self.base_rate * 0.1, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = max(self.updated, time.monotonic() + retry_after)
+
+    def recover(self):
+        with self.lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * 0.05)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "rate": round(self.rate, 3),
+                "base_rate": self.base_rate,
+                "burst": self.burst,
+                "requests": self.requests,
+                "waits": self.waits,
+                "waited_seconds": round(self.waited_seconds, 3),
+                "throttled": self.throttled,
+                "blocked_for": round(max(0.0, self.updated - time.monotonic()), 3),
+            }
+
+
+class HostRateLimiter:
+    """One token bucket per configured upstream host, shared by all threads"""
+
+    def __init__(self, limits):
+        # Most specific suffix wins, so m.facebook.com is matched before facebook.com
+        self.limits = sorted(limits.items(), key=lambda item: -len(item[0]))
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, host):
+        host = (host or "").lower()
+        for suffix, (rate, burst) in self.limits:
+            if host == suffix or host.endswith("." + suffix):
+                with self._lock:
+                    if suffix not in self.buckets:
+                        self.buckets[suffix] = TokenBucket(rate, burst)
+                    return self.buckets[suffix]
+        return None
+
+    def acquire(self, host, max_wait=MAX_WAIT):
+        bucket = self.bucket_for(host)
+        if bucket:
+            wait = bucket.reserve(max_wait)
+            if wait > 0:
+                time.sleep(wait)
+
+    def observe(self, host, response):
+        bucket = self.bucket_for(host)
+        if not bucket:
+            return
+        if response.status_code == 429 or (
+            response.status_code == 503 and "Retry-After" in response.headers
+        ):
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            log.warning(
+                "Upstream throttled us, backing off",
+                extra={"host": host, "retry_after": round(retry_after, 1)},
+            )
+            bucket.throttle(retry_after)
+        elif response.status_code < 400:
+            bucket.recover()
+
+    def stats(self):
+        with self._lock:
+            buckets = dict(self.buckets)
+        return {suffix: bucket.stats() for suffix, bucket in buckets.items()}
+
+
+limiter = HostRateLimiter(
+    parse_rate_limits(os.environ.get("RATE_LIMITS", DEFAULT_RATE_LIMITS))
+)
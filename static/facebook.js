@@ -59,7 +59,15 @@ class FacebookHandler {
             downloadCallback
         );
         
-        buttons.push(hdBtn, sdBtn, autoBtn);
+        const audioBtn = this.createButton(
+            'Audio Only',
+            'audio',
+            'from-teal-500 to-teal-600 hover:from-teal-600 hover:to-teal-700',
+            videoData.available_formats?.audio,
+            downloadCallback
+        );
+        
+        buttons.push(hdBtn, sdBtn, autoBtn, audioBtn);
         return buttons;
     }
 
@@ -98,7 +106,8 @@ class FacebookHandler {
         const formats = [
             { key: 'hd', label: 'HD Quality (1080p+)' },
             { key: 'sd', label: 'SD Quality (720p)' },
-            { key: 'auto', label: 'Auto Quality (Best Available)' }
+            { key: 'auto', label: 'Auto Quality (Best Available)' },
+            { key: 'audio', label: 'Audio Only' }
         ];
         
         return formats.map(format => {
@@ -296,6 +296,9 @@ class VideoDownloader {
             
             if (analyzeText) analyzeText.classList.remove('hidden');
             if (loadingText) loadingText.classList.add('hidden');
+            
+            const dots = this.analyzeBtn.querySelector('.loading-dots');
+            if (dots) dots.textContent = 'Analyzing';
         }
         
         if (this.urlInput) {
@@ -351,7 +354,7 @@ class VideoDownloader {
         
         if (this.videoData && this.videoData.thumbnail) {
             if (this.videoThumbnail) {
-                this.videoThumbnail.src = this.videoData.thumbnail;
+                this.videoThumbnail.src = this.videoData.thumbnail_proxy || this.videoData.thumbnail;
                 this.videoThumbnail.style.display = 'block';
             }
         }
@@ -444,24 +447,7 @@ class VideoDownloader {
         this.resetVideoPreview();
         
         try {
-            console.log('Making API request to:', `${API_BASE}/video-info`);
-            
-            const response = await fetch(`${API_BASE}/video-info`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ url })
-            });
-            
-            console.log('API response status:', response.status);
-            
-            if (!response.ok) {
-                const errorData = await response.json();
-                throw new Error(errorData.error || `HTTP ${response.status}: ${response.statusText}`);
-            }
-            
-            const data = await response.json();
+            const data = await this.fetchVideoInfo(url);
             console.log('API response data:', data);
             
             if (!data.success || !data.data) {
@@ -502,6 +488,91 @@ class VideoDownloader {
         }
     }
     
+    fetchVideoInfo(url) {
+        if (!window.EventSource) {
+            return this.postVideoInfo(url);
+        }
+        
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(`${API_BASE}/video-info/events?url=${encodeURIComponent(url)}`);
+            let settled = false;
+            
+            const settle = () => {
+                settled = true;
+                source.close();
+            };
+            
+            const stages = [
+                'normalizing', 'video_id', 'api_attempt', 'fallback',
+                'page_fetch', 'probe', 'metadata'
+            ];
+            for (const stage of stages) {
+                source.addEventListener(stage, (event) => {
+                    this.setLoadingStage(JSON.parse(event.data));
+                });
+            }
+            
+            source.addEventListener('result', (event) => {
+                settle();
+                resolve(JSON.parse(event.data));
+            });
+            
+            source.addEventListener('failed', (event) => {
+                settle();
+                const data = JSON.parse(event.data);
+                reject(new Error(data.error || `HTTP ${data.status}`));
+            });
+            
+            source.onerror = () => {
+                if (settled) return;
+                settle();
+                console.warn('Progress stream unavailable, falling back to POST');
+                this.postVideoInfo(url).then(resolve, reject);
+            };
+        });
+    }
+    
+    async postVideoInfo(url) {
+        console.log('Making API request to:', `${API_BASE}/video-info`);
+        
+        const response = await fetch(`${API_BASE}/video-info`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ url })
+        });
+        
+        console.log('API response status:', response.status);
+        
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.error || `HTTP ${response.status}: ${response.statusText}`);
+        }
+        
+        return response.json();
+    }
+    
+    setLoadingStage(event) {
+        const labels = {
+            normalizing: 'Resolving link',
+            video_id: 'Found video',
+            api_attempt: 'Asking API',
+            fallback: 'Reading page',
+            page_fetch: 'Fetching page',
+            probe: 'Checking qualities',
+            metadata: 'Reading details'
+        };
+        
+        let label = labels[event.stage] || 'Analyzing';
+        if (event.index && event.total) {
+            label += ` ${event.index}/${event.total}`;
+        }
+        
+        const dots = this.analyzeBtn && this.analyzeBtn.querySelector('.loading-dots');
+        if (dots) dots.textContent = label;
+    }
+    
     resetVideoPreview() {
         if (this.videoPreview) {
             this.videoPreview.classList.add('hidden');
@@ -538,7 +609,8 @@ class VideoDownloader {
             title, 
             author, 
             duration, 
-            thumbnail
+            thumbnail,
+            thumbnail_proxy
         } = this.videoData;
         
         const elements = {
@@ -561,7 +633,7 @@ class VideoDownloader {
             this.platformIcon.textContent = displayHandler.getPlatformIcon();
         }
         
-        this.setupVideoPreview(thumbnail);
+        this.setupVideoPreview(thumbnail_proxy || thumbnail);
         this.setupDownloadOptions();
         this.updateFormatStatus();
         this.enhancePlatformSpecificDisplay();
@@ -720,7 +792,8 @@ class VideoDownloader {
             
             const platform = this.platform;
             const videoId = this.videoData.video_id || 'video';
-            const filename = `${platform}_${videoId}_${quality}.mp4`;
+            const extension = { 'audio/mpeg': 'mp3', 'audio/mp4': 'm4a', 'audio/aac': 'aac' }[blob.type] || 'mp4';
+            const filename = `${platform}_${videoId}_${quality}.${extension}`;
             a.download = filename;
             
             document.body.appendChild(a);
@@ -782,9 +855,9 @@ class VideoDownloader {
                     let qualities = [];
                     
                     if (this.platform === 'tiktok') {
-                        qualities = ['no_watermark', 'watermark'];
+                        qualities = ['no_watermark', 'watermark', 'audio'];
                     } else if (this.platform === 'facebook') {
-                        qualities = ['hd', 'sd', 'auto'];
+                        qualities = ['hd', 'sd', 'auto', 'audio'];
                     }
                     
                     if (qualities[index]) {
@@ -47,7 +47,15 @@ class TikTokHandler {
             downloadCallback
         );
         
-        buttons.push(noWatermarkBtn, watermarkBtn);
+        const audioBtn = this.createButton(
+            'Audio Only',
+            'audio',
+            'from-gray-500 to-gray-600 hover:from-gray-600 hover:to-gray-700',
+            videoData.available_formats?.audio,
+            downloadCallback
+        );
+        
+        buttons.push(noWatermarkBtn, watermarkBtn, audioBtn);
         return buttons;
     }
 
@@ -75,7 +83,8 @@ class TikTokHandler {
     getTikTokFormatStatus(videoData) {
         const formats = [
             { key: 'no_watermark', label: 'No Watermark Version' },
-            { key: 'watermark', label: 'Watermark Version' }
+            { key: 'watermark', label: 'Watermark Version' },
+            { key: 'audio', label: 'Audio Only' }
         ];
         
         return formats.map(format => {
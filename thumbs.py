@@ -0,0 +1,310 @@
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, quote
+
+log = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+# Shared by every worker on the host; MB budget 0 disables the disk tier
+CACHE_DIR = os.environ.get(
+    "THUMBNAIL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "thumbnails")
+)
+DISK_BYTES = int(float(os.environ.get("THUMBNAIL_DISK_MB", "256")) * MB)
+MEMORY_BYTES = int(float(os.environ.get("THUMBNAIL_MEMORY_MB", "16")) * MB)
+# Browsers and edges keep a copy this long; the image behind a src never changes
+MAX_AGE = int(os.environ.get("THUMBNAIL_MAX_AGE", str(7 * 24 * 3600)))
+MAX_IMAGE_BYTES = 2 * MB
+FETCH_TIMEOUT = 10
+PREFETCH_WORKERS = 2
+SWEEP_INTERVAL = 60
+
+# Only images on the platforms' own CDNs are fetched, so this is no open proxy
+ALLOWED_HOSTS = (
+    "tiktokcdn.com",
+    "tiktokcdn-us.com",
+    "byteoversea.com",
+    "ibyteimg.com",
+    "muscdn.com",
+    "fbcdn.net",
+)
+REFERERS = {
+    "tiktok": "https://www.tiktok.com/",
+    "facebook": "https://www.facebook.com/",
+}
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+)
+
+
+def sniff_type(data):
+    """Image MIME type from the leading bytes, or None if it is not an image"""
+    for signature, content_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypheic", b"ftypmif1", b"ftypavif"):
+        return "image/avif" if data[8:12] == b"avif" else "image/heic"
+    return None
+
+
+def is_allowed(url):
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return False
+    host = (parsed.hostname or "").lower()
+    return parsed.scheme in ("http", "https") and any(
+        host == h or host.endswith("." + h) for h in ALLOWED_HOSTS
+    )
+
+
+def proxy_path(platform, video_id, url):
+    """Our URL for a video's thumbnail, or "" when it cannot be proxied"""
+    if not video_id or not str(video_id).isdigit() or not is_allowed(url):
+        return ""
+    return f"/api/thumbnail/{platform}/{video_id}?src={quote(url, safe='')}"
+
+
+def cache_key(platform, video_id, url):
+    """Key for one image of a video.
+
+    The image comes from the caller's src, so src is part of the key: a
+    request with some other image for a video id cannot replace the one
+    everyone else gets.
+    """
+    digest = hashlib.sha1(url.encode()).hexdigest()[:16]
+    return f"{platform}:{video_id}:{digest}"
+
+
+class Thumbnail:
+    def __init__(self, data):
+        self.data = data
+        self.content_type = sniff_type(data) or "image/jpeg"
+        self.etag = hashlib.sha1(data).hexdigest()[:20]
+
+
+class ThumbnailCache:
+    """Two-tier cache of thumbnail images keyed by video and source URL.
+
+    A byte-bounded LRU in memory sits in front of a directory shared by
+    every worker on the host. Disk files are written atomically and the
+    least recently used are removed once the directory passes its budget.
+    Concurrent misses for one video share a single upstream fetch.
+    """
+
+    def __init__(self, directory, memory_bytes, disk_bytes):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._session = None
+        self._executor = None
+        self._last_sweep = 0
+        self._disk_used = 0
+        self.counts = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "fetch_failures": 0,
+            "prefetches": 0,
+            "rejected": 0,
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    def _remember(self, key, thumbnail):
+        size = len(thumbnail.data)
+        if size > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= len(old.data)
+            self._memory[key] = thumbnail
+            self._memory_used += size
+            while self._memory_used > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted.data)
+
+    def cached(self, key):
+        with self._lock:
+            thumbnail = self._memory.get(key)
+            if thumbnail is not None:
+                self._memory.move_to_end(key)
+                self.counts["memory_hits"] += 1
+                return thumbnail
+
+        if not self.disk_bytes:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # mtime doubles as last use for the sweep
+            os.utime(path)
+        except OSError:
+            return None
+        thumbnail = Thumbnail(data)
+        self._remember(key, thumbnail)
+        self._count("disk_hits")
+        return thumbnail
+
+    def _store(self, key, thumbnail):
+        self._remember(key, thumbnail)
+        if not self.disk_bytes:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(thumbnail.data)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning("Thumbnail cache write failed", extra={"error": str(e)})
+            return
+        with self._lock:
+            self._disk_used += len(thumbnail.data)
+        self.sweep()
+
+    def _download(self, platform, url):
+        if self._session is None:
+            from transport import new_session
+
+            self._session = new_session()
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+            "Referer": REFERERS.get(platform, ""),
+            "Accept": "image/avif,image/webp,image/*;q=0.9,*/*;q=0.5",
+        }
+        with self._session.get(
+            url, headers=headers, stream=True, timeout=FETCH_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            body = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                body += chunk
+                if len(body) > MAX_IMAGE_BYTES:
+                    raise ValueError("Thumbnail too large")
+        data = bytes(body)
+        if sniff_type(data) is None:
+            raise ValueError("Upstream did not return an image")
+        return Thumbnail(data)
+
+    def get(self, platform, video_id, url):
+        """Cached thumbnail, fetched from url on a miss; None if unavailable"""
+        key = cache_key(platform, video_id, url)
+        thumbnail = self.cached(key)
+        if thumbnail is not None:
+            return thumbnail
+        if not is_allowed(url):
+            self._count("rejected")
+            return None
+
+        with self._lock:
+            waiting = self._inflight.get(key)
+            if waiting is None:
+                self._inflight[key] = threading.Event()
+                self.counts["misses"] += 1
+        if waiting is not None:
+            # Someone else is fetching this one; use their result
+            waiting.wait(FETCH_TIMEOUT)
+            return self.cached(key)
+
+        try:
+            thumbnail = self._download(platform, url)
+            self._store(key, thumbnail)
+            return thumbnail
+        except Exception as e:
+            self._count("fetch_failures")
+            log.info(
+                "Thumbnail fetch failed",
+                extra={"platform": platform, "video_id": video_id, "error": str(e)},
+            )
+            return None
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+    def prefetch(self, platform, video_id, url):
+        """Warm the cache in the background once a video has been resolved"""
+        if not proxy_path(platform, video_id, url):
+            return
+        key = cache_key(platform, video_id, url)
+        with self._lock:
+            if key in self._memory or key in self._inflight:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    PREFETCH_WORKERS, thread_name_prefix="thumbnail-prefetch"
+                )
+            self.counts["prefetches"] += 1
+        self._executor.submit(
+            contextvars.copy_context().run, self.get, platform, video_id, url
+        )
+
+    def sweep(self, force=False):
+        """Remove the least recently used files once the directory is over budget"""
+        with self._lock:
+            # Other workers write here too, so the directory is rescanned
+            now = time.time()
+            if not force and now - self._last_sweep < SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+
+        try:
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    stat = entry.stat()
+                    # Another worker may still be writing this one
+                    if entry.name.startswith(".tmp-") and now - stat.st_mtime < 60:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+
+        used = sum(size for _, size, _ in entries)
+        entries.sort()
+        for _, size, path in entries:
+            if used <= self.disk_bytes:
+                break
+            try:
+                os.unlink(path)
+                used -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_used = used
+
+    def stats(self):
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_mb": round(self._memory_used / MB, 2),
+                "memory_limit_mb": round(self.memory_bytes / MB, 2),
+                "disk_mb": round(self._disk_used / MB, 2),
+                "disk_limit_mb": round(self.disk_bytes / MB, 2),
+                **self.counts,
+            }
+
+
+cache = ThumbnailCache(CACHE_DIR, MEMORY_BYTES, DISK_BYTES)
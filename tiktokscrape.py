@@ -1,17 +1,74 @@
-import requests
 import re
 import json
 import time
-import tempfile
 import threading
 import os
+import logging
 from urllib.parse import urlparse, parse_qs, unquote
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from downloader import download_to_temp
+from transport import new_session
+from deadline import Deadline
+import progress
+import metastore
+import negcache
+import urlexpiry
+import extraction
+import memtrack
+
+log = logging.getLogger(__name__)
+
+# Embedded state the page may carry, in order of preference
+SCRIPT_PATTERNS = [
+    r'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">(.*?)</script>',
+    r'<script id="SIGI_STATE" type="application/json">(.*?)</script>',
+    r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>',
+    r"window\.__INITIAL_STATE__\s*=\s*({.*?});",
+    r"window\.__DATA__\s*=\s*({.*?});",
+    r'window\["SIGI_STATE"\]\s*=\s*({.*?});',
+]
+# statusCode the page's video detail carries for a deleted (10204) or private
+# (10216) video; captcha and rate-limit pages carry no embedded state at all
+UNAVAILABLE_STATUS = re.compile(r'"statusCode":\s*(?:10204|10216)\b')
+VIDEO_DETAIL_PATHS = [
+    lambda d: d["__DEFAULT_SCOPE__"]["webapp.video-detail"]["itemInfo"]["itemStruct"],
+    lambda d: d["ItemModule"][next(k for k in d["ItemModule"].keys() if k.isdigit())],
+    lambda d: d["props"]["pageProps"]["itemInfo"]["itemStruct"],
+]
+
+
+def scan_video_details(html_content: str) -> List[Dict]:
+    """Video detail objects found in the page's embedded JSON state.
+
+    Runs through extraction.run(), so it may execute in a worker process:
+    only the detail objects come back, never the whole decoded tree.
+    """
+    details = []
+    for pattern in SCRIPT_PATTERNS:
+        script_match = re.search(pattern, html_content, re.DOTALL)
+        if not script_match:
+            continue
+        try:
+            json_data = script_match.group(1)
+            json_data = json_data.replace('\\"', '"').replace("\\/", "/")
+            data = json.loads(json_data)
+        except Exception as e:
+            log.debug("Embedded JSON did not parse", extra={"error": str(e)})
+            continue
+
+        for path in VIDEO_DETAIL_PATHS:
+            try:
+                details.append(path(data))
+                break
+            except (KeyError, TypeError, StopIteration):
+                continue
+    return details
 
 
 class TikTokScraper:
     def __init__(self):
-        self.session = requests.Session()
+        self.session = new_session()
         self.session.headers.update(
             {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -27,11 +84,24 @@ class TikTokScraper:
             }
         )
 
-    def normalize_url(self, url: str) -> str:
+    def report(self, stage: str, **data) -> None:
+        progress.emit(stage, platform="tiktok", **data)
+
+    def normalize_url(self, url: str, deadline: Optional[Deadline] = None) -> str:
+        deadline = deadline or Deadline(None)
         try:
             if "vm.tiktok.com" in url or "vt.tiktok.com" in url:
-                response = self.session.head(url, allow_redirects=True, timeout=10)
-                url = response.url
+                resolved = metastore.get("short_link", url)
+                if not resolved:
+                    response = self.session.head(
+                        url, allow_redirects=True, timeout=deadline.timeout(10)
+                    )
+                    resolved = response.url
+                    if resolved != url:
+                        metastore.put(
+                            "short_link", url, resolved, metastore.SHORT_LINK_TTL
+                        )
+                url = resolved
 
             if "m.tiktok.com" in url:
                 url = url.replace("m.tiktok.com", "www.tiktok.com")
@@ -41,7 +111,7 @@ class TikTokScraper:
 
             return url
         except Exception as e:
-            print(f"URL normalization error: {e}")
+            log.warning("URL normalization failed", extra={"url": url, "error": str(e)})
             return url
 
     def extract_video_id(self, url: str) -> Optional[str]:
@@ -119,7 +189,10 @@ class TikTokScraper:
 
         return f"{minutes}:{seconds:02d}"
 
-    def get_video_data_from_api(self, video_id: str) -> Optional[Dict]:
+    def get_video_data_from_api(
+        self, video_id: str, deadline: Optional[Deadline] = None
+    ) -> Optional[Dict]:
+        deadline = deadline or Deadline(None)
         try:
             api_url = "https://api22-normal-c-alisg.tiktokv.com/aweme/v1/feed/"
             params = {
@@ -150,7 +223,7 @@ class TikTokScraper:
             }
 
             response = self.session.get(
-                api_url, params=params, headers=headers, timeout=15
+                api_url, params=params, headers=headers, timeout=deadline.timeout(15)
             )
 
             if response.status_code == 200:
@@ -160,10 +233,10 @@ class TikTokScraper:
                         aweme = data["aweme_list"][0]
                         return self.extract_video_info_from_api(aweme)
                 except json.JSONDecodeError:
-                    print("API returned invalid JSON")
+                    log.warning("TikTok API returned invalid JSON")
 
         except Exception as e:
-            print(f"API request failed: {e}")
+            log.warning("TikTok API request failed", extra={"error": str(e)})
         return None
 
     def extract_video_info_from_api(self, aweme: Dict) -> Dict:
@@ -210,6 +283,9 @@ class TikTokScraper:
             elif video.get("dynamic_cover", {}).get("url_list"):
                 cover_url = video["dynamic_cover"]["url_list"][0]
 
+            music_urls = aweme.get("music", {}).get("play_url", {}).get("url_list")
+            audio_url = music_urls[0] if music_urls else None
+
             duration = video.get("duration", 0)
             formatted_duration = self.format_duration(duration)
 
@@ -217,6 +293,7 @@ class TikTokScraper:
                 "video_url_no_watermark": no_watermark_url,
                 "video_url_watermark": watermark_url,
                 "video_preview_url": preview_url,
+                "audio_url": audio_url,
                 "title": aweme.get("desc", "TikTok Video"),
                 "author": author_info.get("nickname", "Unknown"),
                 "duration": formatted_duration,
@@ -225,10 +302,13 @@ class TikTokScraper:
                 "height": video.get("height", 0),
             }
         except Exception as e:
-            print(f"Failed to extract video info from API: {e}")
+            log.warning(
+                "Failed to extract video info from API", extra={"error": str(e)}
+            )
             return {"error": f"Failed to extract video info: {str(e)}"}
 
-    def scrape_from_web(self, url: str) -> Dict:
+    def scrape_from_web(self, url: str, deadline: Optional[Deadline] = None) -> Dict:
+        deadline = deadline or Deadline(None)
         try:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -242,32 +322,16 @@ class TikTokScraper:
                 "Sec-Fetch-Site": "none",
             }
 
-            response = self.session.get(url, headers=headers, timeout=20)
+            response = self.session.get(
+                url, headers=headers, timeout=deadline.timeout(20)
+            )
             response.raise_for_status()
             html_content = response.text
 
-            script_patterns = [
-                r'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__" type="application/json">(.*?)</script>',
-                r'<script id="SIGI_STATE" type="application/json">(.*?)</script>',
-                r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>',
-                r"window\.__INITIAL_STATE__\s*=\s*({.*?});",
-                r"window\.__DATA__\s*=\s*({.*?});",
-                r'window\["SIGI_STATE"\]\s*=\s*({.*?});',
-            ]
-
-            for pattern in script_patterns:
-                script_match = re.search(pattern, html_content, re.DOTALL)
-                if script_match:
-                    try:
-                        json_data = script_match.group(1)
-                        json_data = json_data.replace('\\"', '"').replace("\\/", "/")
-                        data = json.loads(json_data)
-                        result = self.parse_json_data(data)
-                        if result and "error" not in result:
-                            return result
-                    except Exception as e:
-                        print(f"JSON parsing failed: {e}")
-                        continue
+            for video_detail in extraction.run(scan_video_details, html_content):
+                result = self.extract_video_info_from_web(video_detail)
+                if result and "error" not in result:
+                    return result
 
             video_url_patterns = [
                 r'"playAddr":"([^"]+)"',
@@ -310,34 +374,13 @@ class TikTokScraper:
                         "height": 0,
                     }
 
+            if UNAVAILABLE_STATUS.search(html_content):
+                return {"error": "TikTok video is unavailable"}
             return {"error": "Could not extract video data from webpage"}
 
         except Exception as e:
             return {"error": f"Web scraping failed: {str(e)}"}
 
-    def parse_json_data(self, data: Dict) -> Optional[Dict]:
-        try:
-            patterns = [
-                lambda d: d["__DEFAULT_SCOPE__"]["webapp.video-detail"]["itemInfo"][
-                    "itemStruct"
-                ],
-                lambda d: d["ItemModule"][
-                    next(k for k in d["ItemModule"].keys() if k.isdigit())
-                ],
-                lambda d: d["props"]["pageProps"]["itemInfo"]["itemStruct"],
-            ]
-
-            for pattern in patterns:
-                try:
-                    video_detail = pattern(data)
-                    return self.extract_video_info_from_web(video_detail)
-                except (KeyError, TypeError, StopIteration):
-                    continue
-
-        except Exception as e:
-            print(f"JSON data parsing failed: {e}")
-        return None
-
     def extract_video_info_from_web(self, video_detail: Dict) -> Dict:
         try:
             video = video_detail.get("video", {})
@@ -358,6 +401,8 @@ class TikTokScraper:
                 or video.get("dynamicCover", "")
             )
 
+            audio_url = video_detail.get("music", {}).get("playUrl") or None
+
             duration = video.get("duration", 0)
             formatted_duration = self.format_duration(duration)
 
@@ -365,6 +410,7 @@ class TikTokScraper:
                 "video_url_no_watermark": no_watermark_url,
                 "video_url_watermark": watermark_url,
                 "video_preview_url": preview_url,
+                "audio_url": audio_url,
                 "title": video_detail.get("desc", "TikTok Video"),
                 "author": author_info.get("nickname", "Unknown"),
                 "duration": formatted_duration,
@@ -375,46 +421,101 @@ class TikTokScraper:
         except Exception as e:
             return {"error": f"Failed to extract video info from web: {str(e)}"}
 
-    def get_video_data(self, url: str) -> Dict:
+    def get_video_data(self, url: str, deadline: Optional[Deadline] = None) -> Dict:
+        deadline = deadline or Deadline(None)
         try:
-            print(f"Processing TikTok URL: {url}")
+            log.info("Processing TikTok URL", extra={"url": url})
+            self.report("normalizing", url=url)
 
-            normalized_url = self.normalize_url(url)
-            print(f"Normalized URL: {normalized_url}")
+            failure = negcache.lookup("tiktok", url)
+            if failure:
+                return failure
+
+            normalized_url = self.normalize_url(url, deadline)
+            log.debug("Normalized URL", extra={"url": normalized_url})
 
             video_id = self.extract_video_id(normalized_url)
             if not video_id:
-                return {
+                error = {
                     "error": "Could not extract video ID from URL. Please check the URL format."
                 }
+                # A short link that did not resolve may only have hit a network error
+                unresolved = "vm.tiktok.com" in normalized_url or (
+                    "vt.tiktok.com" in normalized_url
+                )
+                negcache.remember(
+                    "tiktok", url, error, "upstream" if unresolved else "malformed"
+                )
+                return error
+
+            log.debug("Extracted video id", extra={"video_id": video_id})
+            self.report("video_id", video_id=video_id)
+
+            stored = metastore.get(
+                "tiktok_video",
+                video_id,
+                refresh=lambda: self.resolve_video(
+                    video_id, normalized_url, Deadline(metastore.REFRESH_DEADLINE)
+                ),
+            )
+            if stored:
+                log.debug(
+                    "Using stored TikTok video data", extra={"video_id": video_id}
+                )
+                return stored
 
-            print(f"Video ID: {video_id}")
-
-            api_result = self.get_video_data_from_api(video_id)
-            if api_result and "error" not in api_result:
-                if api_result.get("video_url_no_watermark") or api_result.get(
-                    "video_url_watermark"
-                ):
-                    api_result["video_id"] = video_id
-                    print("Successfully extracted from TikTok API")
-                    return api_result
-
-            print("TikTok API failed, trying web scraping...")
-
-            web_result = self.scrape_from_web(normalized_url)
-            if "error" not in web_result:
-                web_result["video_id"] = video_id
-                print("Successfully extracted from TikTok web scraping")
-                return web_result
+            failure = negcache.lookup("tiktok", video_id)
+            if failure:
+                return failure
 
-            return web_result
+            result = self.resolve_video(video_id, normalized_url, deadline)
+            if "error" in result:
+                negcache.remember("tiktok", video_id, result)
+            return result
 
         except Exception as e:
             error_msg = f"Failed to get TikTok video data: {str(e)}"
-            print(error_msg)
+            log.exception("Failed to get TikTok video data")
             return {"error": error_msg}
 
-    def download_video_file(self, video_url, no_watermark=True):
+    def resolve_video(
+        self, video_id: str, normalized_url: str, deadline: Deadline
+    ) -> Dict:
+        self.report("api_attempt")
+        with memtrack.stage("tiktok", "api"):
+            api_result = self.get_video_data_from_api(video_id, deadline)
+        if api_result and "error" not in api_result:
+            if api_result.get("video_url_no_watermark") or api_result.get(
+                "video_url_watermark"
+            ):
+                api_result["video_id"] = video_id
+                log.info("Resolved through TikTok API", extra={"video_id": video_id})
+                self.store_video(video_id, api_result)
+                return api_result
+
+        if not deadline.allows():
+            return {"error": "Timed out while resolving TikTok video"}
+
+        log.info("TikTok API failed, trying web scraping", extra={"video_id": video_id})
+        self.report("fallback", method="web_scrape")
+
+        with memtrack.stage("tiktok", "web_scrape"):
+            web_result = self.scrape_from_web(normalized_url, deadline)
+        if "error" not in web_result:
+            web_result["video_id"] = video_id
+            log.info("Resolved through TikTok web page", extra={"video_id": video_id})
+            self.store_video(video_id, web_result)
+
+        return web_result
+
+    def store_video(self, video_id: str, video_data: Dict) -> None:
+        # Kept until shortly before the first signed CDN URL in it expires
+        ttl = urlexpiry.ttl_for(video_data, metastore.VIDEO_TTL)
+        metastore.put("tiktok_video", video_id, video_data, ttl)
+
+    def download_video_file(
+        self, video_url, no_watermark=True, video_id=None, spool=None, variant=None
+    ):
         try:
             headers = {
                 "User-Agent": self.session.headers["User-Agent"],
@@ -422,30 +523,32 @@ class TikTokScraper:
                 "Accept": "video/webm,video/ogg,video/*;q=0.9,application/ogg;q=0.7,audio/*;q=0.6,*/*;q=0.5",
             }
 
-            video_response = self.session.get(
-                video_url, stream=True, headers=headers, timeout=60
+            resume_key = None
+            if video_id:
+                variant = variant or ("no_watermark" if no_watermark else "watermark")
+                resume_key = f"tiktok_{video_id}_{variant}"
+
+            temp_path = download_to_temp(
+                self.session,
+                video_url,
+                headers=headers,
+                timeout=60,
+                resume_key=resume_key,
+                on_progress=progress.bound("download", platform="tiktok"),
+                spool=spool,
             )
-            video_response.raise_for_status()
-
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-
-            for chunk in video_response.iter_content(chunk_size=8192):
-                if chunk:
-                    temp_file.write(chunk)
-
-            temp_file.close()
 
             def remove_file():
                 time.sleep(300)
                 try:
-                    os.unlink(temp_file.name)
+                    os.unlink(temp_path)
                 except:
                     pass
 
             threading.Thread(target=remove_file, daemon=True).start()
 
-            return temp_file.name
+            return temp_path
 
         except Exception as e:
-            print(f"TikTok download failed: {e}")
+            log.warning("TikTok download failed", extra={"error": str(e)})
             return None
@@ -0,0 +1,105 @@
+import time
+import http.client
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+# Each read should cover roughly this much wall time at the current rate
+TARGET_READ_SECONDS = 0.01
+
+
+class AdaptiveChunker:
+    """Pick the next read size from the throughput of the previous reads"""
+
+    def __init__(self, min_size=MIN_CHUNK_SIZE, max_size=MAX_CHUNK_SIZE):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.size = min_size
+        self._rate = None
+
+    def update(self, nbytes, elapsed):
+        if elapsed <= 0:
+            self.size = min(self.size * 2, self.max_size)
+            return self.size
+
+        rate = nbytes / elapsed
+        # Smooth out single slow or fast reads
+        self._rate = rate if self._rate is None else 0.7 * self._rate + 0.3 * rate
+
+        target = int(self._rate * TARGET_READ_SECONDS) & ~4095
+        self.size = max(self.min_size, min(target, self.max_size))
+        return self.size
+
+
+def _raw_source(response):
+    """Return the http.client response underneath a streamed requests response.
+
+    Reading from it with readinto() fills our own buffer directly, where
+    urllib3's read() and iter_content() allocate a new bytes object per
+    chunk. Encoded bodies still need urllib3's decoder, so those return None.
+    """
+    if response.headers.get("Content-Encoding", "identity").lower() not in (
+        "",
+        "identity",
+    ):
+        return None
+
+    source = getattr(response.raw, "_fp", None)
+    if source is None or not hasattr(source, "readinto"):
+        return None
+    return source
+
+
+def read_chunks(response, chunker=None):
+    """Yield the body of a streamed response as memoryviews.
+
+    Every view points into the same preallocated buffer, so it is only valid
+    until the next iteration; callers write or copy it out before then.
+    """
+    source = _raw_source(response)
+    if source is None:
+        for chunk in response.iter_content(chunk_size=MIN_CHUNK_SIZE):
+            if chunk:
+                yield memoryview(chunk)
+        return
+
+    chunker = chunker or AdaptiveChunker()
+    view = memoryview(bytearray(chunker.max_size))
+
+    while True:
+        started = time.perf_counter()
+        try:
+            nbytes = source.readinto(view[: chunker.size])
+        except http.client.HTTPException as e:
+            raise IOError(f"Upstream transfer broke off: {e!r}") from e
+        if not nbytes:
+            # http.client reports a short body as a plain end of stream
+            if getattr(source, "length", None):
+                raise IOError(f"Upstream transfer ended {source.length} bytes short")
+            break
+
+        chunker.update(nbytes, time.perf_counter() - started)
+        yield view[:nbytes]
+
+    # Let urllib3 see the end of the body so the connection goes back to the pool
+    response.raw.read()
+
+
+def copy_to_file(response, f, on_chunk=None):
+    """Write a streamed response into an open binary file, return bytes written"""
+    total = 0
+    for view in read_chunks(response):
+        f.write(view)
+        total += len(view)
+        if on_chunk:
+            on_chunk(len(view))
+    return total
+
+
+def iter_response(response):
+    """Stream an upstream response to a WSGI client and close it afterwards"""
+    try:
+        for view in read_chunks(response):
+            # WSGI servers only accept bytes, so this is the one copy we keep
+            yield bytes(view)
+    finally:
+        response.close()
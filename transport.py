@@ -0,0 +1,394 @@
+import os
+import logging
+import time
+import queue
+import threading
+import http.client
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter, BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.poolmanager import PoolManager
+
+from ratelimit import MAX_WAIT, limiter
+from deadline import DeadlineExceeded, MIN_CALL_BUDGET
+
+log = logging.getLogger(__name__)
+
+try:
+    import httpx
+    import h2  # noqa: F401  httpx only speaks HTTP/2 when h2 is installed
+except ImportError:
+    httpx = None
+
+POOL_SIZE = int(os.environ.get("TRANSPORT_POOL_SIZE", "32"))
+MAX_HOSTS = int(os.environ.get("TRANSPORT_MAX_HOSTS", "64"))
+IDLE_TIMEOUT = float(os.environ.get("TRANSPORT_IDLE_TIMEOUT", "60"))
+HTTP2_ENABLED = os.environ.get("TRANSPORT_HTTP2") == "1"
+# Send every upstream request here instead, for load tests against
+# benchmarks/upstream_standin.py; the real host travels in X-Upstream-Host
+UPSTREAM_OVERRIDE = os.environ.get("UPSTREAM_OVERRIDE", "").rstrip("/")
+
+
+def _parse_host_pool_sizes(value):
+    sizes = {}
+    for item in value.split(","):
+        host, _, size = item.strip().partition("=")
+        if host and size.isdigit():
+            sizes[host.lower()] = int(size)
+    return sizes
+
+
+# Video CDNs see segmented downloads and previews, so they get bigger pools
+HOST_POOL_SIZES = _parse_host_pool_sizes(
+    os.environ.get(
+        "TRANSPORT_HOST_POOL_SIZES",
+        "tiktokcdn.com=64,tiktokcdn-us.com=64,byteoversea.com=64,fbcdn.net=64",
+    )
+)
+
+_counters = {}
+_counters_lock = threading.Lock()
+_adapter = None
+_adapter_lock = threading.Lock()
+_reaper_started = False
+
+
+def pool_size_for(host):
+    host = (host or "").lower()
+    for suffix, size in HOST_POOL_SIZES.items():
+        if host == suffix or host.endswith("." + suffix):
+            return size
+    return POOL_SIZE
+
+
+def _count(host, name):
+    with _counters_lock:
+        host_counters = _counters.setdefault(
+            host, {"discarded_full": 0, "evicted_idle": 0}
+        )
+        host_counters[name] += 1
+
+
+class _TrackedPoolMixin:
+    def _put_conn(self, conn):
+        if conn is not None:
+            conn.last_used = time.monotonic()
+            if self.pool is not None and self.pool.full():
+                _count(self.host, "discarded_full")
+        super()._put_conn(conn)
+
+    def idle_connections(self):
+        if self.pool is None:
+            return 0
+        return sum(1 for conn in list(self.pool.queue) if conn is not None)
+
+    def evict_idle(self, max_idle):
+        """Close pooled connections that have sat unused for max_idle seconds"""
+        if self.pool is None:
+            return
+
+        now = time.monotonic()
+        kept = []
+        while True:
+            try:
+                conn = self.pool.get(block=False)
+            except queue.Empty:
+                break
+            if conn is not None and now - getattr(conn, "last_used", now) > max_idle:
+                conn.close()
+                conn = None
+                _count(self.host, "evicted_idle")
+            kept.append(conn)
+
+        # Put them back in their original LIFO order
+        for conn in reversed(kept):
+            try:
+                self.pool.put(conn, block=False)
+            except queue.Full:
+                if conn:
+                    conn.close()
+
+
+class TrackedHTTPConnectionPool(_TrackedPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class TrackedHTTPSConnectionPool(_TrackedPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class _TrackedPoolManager(PoolManager):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_classes_by_scheme = {
+            "http": TrackedHTTPConnectionPool,
+            "https": TrackedHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        if request_context is None:
+            request_context = self.connection_pool_kw.copy()
+        request_context["maxsize"] = pool_size_for(host)
+        return super()._new_pool(scheme, host, port, request_context)
+
+    def live_pools(self):
+        pools = []
+        for key in self.pools.keys():
+            pool = self.pools.get(key)
+            if pool is not None:
+                pools.append(pool)
+        return pools
+
+
+def _rate_limited(send, request, **kwargs):
+    host = urlparse(request.url).hostname
+    # Callers pass their remaining deadline as the timeout, so never queue longer
+    timeout = kwargs.get("timeout")
+    parts = timeout if isinstance(timeout, tuple) else (timeout,)
+    budgets = [t for t in parts if isinstance(t, (int, float))]
+    max_wait = min([MAX_WAIT] + budgets)
+
+    started = time.monotonic()
+    limiter.acquire(host, max_wait)
+    waited = time.monotonic() - started
+    if waited > 0 and budgets:
+        # The wait came out of the caller's budget; the send gets what is left
+        kwargs["timeout"] = _reduce_timeout(timeout, waited)
+
+    response = _send_upstream(send, request, **kwargs)
+    limiter.observe(host, response)
+    return response
+
+
+def _reduce_timeout(timeout, waited):
+    """Take time already spent off a timeout or (connect, read) tuple"""
+
+    def reduce(part):
+        if not isinstance(part, (int, float)):
+            return part
+        left = part - waited
+        if left < MIN_CALL_BUDGET:
+            raise DeadlineExceeded(
+                f"Only {max(0.0, left):.1f}s of request budget left after rate limiting"
+            )
+        return left
+
+    if isinstance(timeout, tuple):
+        return tuple(reduce(part) for part in timeout)
+    return reduce(timeout)
+
+
+def _send_upstream(send, request, **kwargs):
+    if not UPSTREAM_OVERRIDE:
+        return send(request, **kwargs)
+
+    original_url = request.url
+    parsed = urlparse(original_url)
+    request.url = UPSTREAM_OVERRIDE + (parsed.path or "/")
+    if parsed.query:
+        request.url += "?" + parsed.query
+    request.headers["X-Upstream-Host"] = parsed.hostname
+    try:
+        response = send(request, **kwargs)
+    finally:
+        request.url = original_url
+    # Redirects, cookies and URL checks in the scrapers see the real host
+    response.url = original_url
+    return response
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose per-host pools are sized, tracked and reaped"""
+
+    def send(self, request, **kwargs):
+        return _rate_limited(super().send, request, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = _TrackedPoolManager(
+            num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs
+        )
+
+
+class _HttpxRaw:
+    """Just enough of urllib3's response interface for requests.Response"""
+
+    def __init__(self, response):
+        self._response = response
+        self._original_response = _OriginalResponse(response)
+
+    def stream(self, amt=None, decode_content=True):
+        try:
+            yield from self._response.iter_bytes(amt)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ChunkedEncodingError(e)
+
+    def read(self, amt=None, decode_content=True):
+        return b"".join(self.stream(amt))
+
+    def close(self):
+        self._response.close()
+
+    def release_conn(self):
+        self._response.close()
+
+
+class _OriginalResponse:
+    # requests reads Set-Cookie headers from the http.client message
+    def __init__(self, response):
+        self.msg = http.client.HTTPMessage()
+        for name, value in response.headers.multi_items():
+            self.msg[name] = value
+
+
+class Http2Adapter(BaseAdapter):
+    """Send requests through an httpx client that negotiates HTTP/2.
+
+    Pooling, keep-alive and idle expiry are handled by httpx itself; per
+    request verify/cert/proxies arguments are not supported.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.client = httpx.Client(
+            http2=True,
+            follow_redirects=False,
+            limits=httpx.Limits(
+                max_connections=MAX_HOSTS * POOL_SIZE,
+                max_keepalive_connections=POOL_SIZE,
+                keepalive_expiry=IDLE_TIMEOUT,
+            ),
+        )
+
+    def send(self, request, **kwargs):
+        return _rate_limited(self._send, request, **kwargs)
+
+    def _send(self, request, stream=False, timeout=None, **kwargs):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        else:
+            timeout = httpx.Timeout(timeout)
+
+        try:
+            hx_request = self.client.build_request(
+                request.method,
+                request.url,
+                headers=dict(request.headers),
+                content=request.body,
+                timeout=timeout,
+            )
+            hx_response = self.client.send(hx_request, stream=True)
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(e, request=request)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(e, request=request)
+        except httpx.ConnectError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.RequestException(e, request=request)
+
+        response = requests.Response()
+        response.status_code = hx_response.status_code
+        response.reason = hx_response.reason_phrase
+        response.headers = CaseInsensitiveDict(hx_response.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _HttpxRaw(hx_response)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        self.client.close()
+
+
+def _shared_adapter():
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            if HTTP2_ENABLED and httpx is not None:
+                _adapter = Http2Adapter()
+            else:
+                if HTTP2_ENABLED:
+                    log.warning("HTTP/2 requested but httpx[http2] is not installed")
+                _adapter = PooledAdapter(
+                    pool_connections=MAX_HOSTS, pool_maxsize=POOL_SIZE
+                )
+        return _adapter
+
+
+def evict_idle_connections(max_idle=IDLE_TIMEOUT):
+    manager = getattr(_shared_adapter(), "poolmanager", None)
+    if manager is None:
+        return
+    for pool in manager.live_pools():
+        pool.evict_idle(max_idle)
+
+
+def _reap_idle_connections():
+    while True:
+        time.sleep(max(IDLE_TIMEOUT / 2, 1))
+        try:
+            evict_idle_connections()
+        except Exception as e:
+            log.warning("Idle connection eviction failed", extra={"error": str(e)})
+
+
+def _start_reaper():
+    global _reaper_started
+    with _adapter_lock:
+        if _reaper_started:
+            return
+        _reaper_started = True
+    threading.Thread(target=_reap_idle_connections, daemon=True).start()
+
+
+def new_session():
+    """Return a requests.Session that draws on the shared connection pools.
+
+    Sessions keep their own headers and cookies; the connections underneath
+    are shared by every session and thread in the process.
+    """
+    session = requests.Session()
+    adapter = _shared_adapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    _start_reaper()
+    return session
+
+
+def pool_stats():
+    adapter = _shared_adapter()
+    stats = {
+        "http2": isinstance(adapter, Http2Adapter),
+        "pool_size": POOL_SIZE,
+        "max_hosts": MAX_HOSTS,
+        "idle_timeout": IDLE_TIMEOUT,
+        "hosts": {},
+    }
+
+    manager = getattr(adapter, "poolmanager", None)
+    for pool in manager.live_pools() if manager else []:
+        host_stats = stats["hosts"].setdefault(
+            pool.host,
+            {"maxsize": 0, "idle": 0, "connections_opened": 0, "requests": 0},
+        )
+        host_stats["maxsize"] += pool.pool.maxsize if pool.pool else 0
+        host_stats["idle"] += pool.idle_connections()
+        host_stats["connections_opened"] += pool.num_connections
+        host_stats["requests"] += pool.num_requests
+
+    with _counters_lock:
+        for host, counters in _counters.items():
+            stats["hosts"].setdefault(host, {}).update(counters)
+
+    return stats
@@ -0,0 +1,69 @@
+import os
+import time
+from urllib.parse import urlparse, parse_qs
+
+# Never hand out a signed URL with less than this much life left in it
+EXPIRY_MARGIN = float(os.environ.get("URL_EXPIRY_MARGIN", "120"))
+# Titles and stats go stale too, even behind a long-lived URL
+MAX_TTL = float(os.environ.get("URL_EXPIRY_MAX_TTL", str(6 * 3600)))
+
+# TikTok CDNs sign with decimal Unix times under either name
+DECIMAL_PARAMS = ("x-expires", "expire")
+# Anything further out than this is not a timestamp we understand
+MAX_PLAUSIBLE_LIFETIME = 365 * 24 * 3600
+
+
+def url_expires_at(url):
+    """Unix time at which a signed CDN URL stops working, or None.
+
+    Facebook (fbcdn.net) URLs carry the expiry as hex in `oe=`; TikTok CDN
+    URLs carry it as a decimal timestamp in `x-expires=` or `expire=`.
+    """
+    try:
+        query = parse_qs(urlparse(url).query)
+    except ValueError:
+        return None
+
+    candidates = []
+    for value in query.get("oe", []):
+        try:
+            candidates.append(int(value, 16))
+        except ValueError:
+            pass
+    for name in DECIMAL_PARAMS:
+        for value in query.get(name, []):
+            if value.isdigit():
+                candidates.append(int(value))
+
+    latest = time.time() + MAX_PLAUSIBLE_LIFETIME
+    candidates = [c for c in candidates if c < latest]
+    return min(candidates) if candidates else None
+
+
+def earliest_expiry(value):
+    """Earliest expiry of any signed URL found anywhere inside value"""
+    if isinstance(value, str):
+        return url_expires_at(value) if value.startswith("http") else None
+
+    if isinstance(value, dict):
+        items = value.values()
+    elif isinstance(value, (list, tuple)):
+        items = value
+    else:
+        return None
+
+    expiries = [e for e in map(earliest_expiry, items) if e is not None]
+    return min(expiries) if expiries else None
+
+
+def ttl_for(value, default):
+    """Cache lifetime for data holding signed URLs.
+
+    Data without any signed URL keeps the default; otherwise it lives until
+    EXPIRY_MARGIN before its first URL dies, capped at MAX_TTL. A result of
+    0 or less means the data is already too close to expiry to cache.
+    """
+    expires_at = earliest_expiry(value)
+    if expires_at is None:
+        return default
+    return min(MAX_TTL, expires_at - time.time() - EXPIRY_MARGIN)